@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -40,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,6 +70,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'Student_Management_System.wsgi.application'
 
+# Bulk upload endpoints accept JSON bodies with tens of thousands of rows.
+DATA_UPLOAD_MAX_MEMORY_SIZE = 20 * 1024 * 1024
+
+# Threads used to hash passwords during bulk user imports (defaults to the CPU count).
+BULK_IMPORT_HASH_WORKERS = int(os.getenv('BULK_IMPORT_HASH_WORKERS', 0)) or None
+
 from decouple import config
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -78,6 +86,16 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL')
 
+# Celery workers keep one SMTP connection open between tasks; after this many
+# idle seconds it is checked with a NOOP before being reused.
+MAIL_CONNECTION_IDLE_TIMEOUT = 60
+
+# Per-view query counts, SQL time and latency percentiles (core.middleware),
+# readable at /api/admin/query-stats/. Off unless enabled.
+QUERY_STATS_ENABLED = config('QUERY_STATS_ENABLED', default=False, cast=bool)
+QUERY_STATS_SERVER_TIMING = config('QUERY_STATS_SERVER_TIMING', default=False, cast=bool)
+QUERY_STATS_WINDOW = int(os.getenv('QUERY_STATS_WINDOW', 1000))
+
 
 
 # Load .env
@@ -114,10 +132,31 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+AUTHENTICATION_BACKENDS = [
+    'user.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# The first hasher is used for new passwords; the others can still verify
+# older hashes, which are upgraded transparently on the next login.
+PASSWORD_HASHERS = [
+    'user.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Argon2 cost. Use `python manage.py bench_login` to tune these for the
+# login servers' cores; a parallelism of 1 gives the most logins/sec under load.
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', 102400))
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', 1))
+
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -135,6 +174,10 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),  
 }
 
+# How long a user's saved role/active state overrides older token claims.
+# Must be at least the access token lifetime.
+AUTH_USER_STATE_TIMEOUT = int(SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds())
+
 SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': False,  # This disables Django session login
     'SECURITY_DEFINITIONS': {
@@ -154,6 +197,53 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Karachi'
 
+# Outbox events (emails and notifications recorded with the write that
+# caused them) are sent to the workers by `celery beat` or by the
+# `relay_outbox` command. An event dispatched but not processed within
+# OUTBOX_REDELIVERY_TIMEOUT seconds is sent again, up to OUTBOX_MAX_ATTEMPTS times.
+OUTBOX_RELAY_INTERVAL = float(os.getenv('OUTBOX_RELAY_INTERVAL', 2))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 200))
+OUTBOX_REDELIVERY_TIMEOUT = int(os.getenv('OUTBOX_REDELIVERY_TIMEOUT', 300))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+
+# Teachers get one digest per course for the enrollment changes of the last
+# TEACHER_DIGEST_WINDOW seconds instead of an email per student; 0 turns
+# digests off. Due digests are sent every TEACHER_DIGEST_FLUSH_INTERVAL seconds.
+TEACHER_DIGEST_WINDOW = int(os.getenv('TEACHER_DIGEST_WINDOW', 60))
+TEACHER_DIGEST_FLUSH_INTERVAL = float(os.getenv('TEACHER_DIGEST_FLUSH_INTERVAL', 15))
+
+CELERY_BEAT_SCHEDULE = {
+    'relay-outbox': {'task': 'admin.task.relay_outbox', 'schedule': OUTBOX_RELAY_INTERVAL},
+    'flush-teacher-digests': {'task': 'admin.task.flush_teacher_digests', 'schedule': TEACHER_DIGEST_FLUSH_INTERVAL},
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_URL', 'redis://localhost:6379/1'),
+    }
+}
+
+# Timetables are patched in place after every committed change; this only bounds how long
+# an unused one stays in the cache.
+TIMETABLE_CACHE_TIMEOUT = int(os.getenv('TIMETABLE_CACHE_TIMEOUT', 60 * 60 * 24 * 7))
+
+# Cached admin read responses are invalidated by version bumps, not expiry;
+# the timeout only evicts entries nobody reads any more.
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 60 * 60))
+
+# Rows the streaming exports fetch per round trip; an export holds about
+# this many rows in memory however large the table is.
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+# Tests run against a per-process in-memory cache.
+if 'test' in sys.argv:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 
 # Internationalization
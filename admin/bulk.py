@@ -0,0 +1,262 @@
+import csv
+import io
+import os
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from core.conditional import touch_courses
+from core.counters import adjust_role_count
+from core.outbox import emit
+from core.stats import enrollments_counted
+from core.models import User, Course, Enrollment
+from core.timetable import enrollments_changed
+from core.versioning import bump_versions, student_version_name, group_version_name
+from .serializers import BulkEnrollmentRowSerializer, BulkUserRowSerializer, generate_random_password
+from .task import send_bulk_user_credentials_email, provision_users_job
+
+BULK_CHUNK_SIZE = 1000
+USER_IMPORT_CHUNK_SIZE = 500
+USER_IMPORT_JOB_KEY = 'bulk_user_import:{}'
+USER_IMPORT_JOB_TIMEOUT = 60 * 60 * 24
+
+
+def read_rows(request):
+    """
+    Return the uploaded rows as a list of dicts.
+
+    Accepts either a CSV file in the `file` multipart field or a JSON array
+    (optionally wrapped as {"rows": [...]}) in the request body.
+    """
+    upload = request.FILES.get('file')
+    if upload is not None:
+        reader = csv.DictReader(io.TextIOWrapper(upload.file, encoding='utf-8-sig'))
+        # Blank CSV cells mean "use the default", not an empty string.
+        return [
+            {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+            for row in reader
+        ]
+
+    data = request.data
+    if isinstance(data, dict):
+        data = data.get('rows')
+    if not isinstance(data, list):
+        raise serializers.ValidationError(
+            {"detail": "Send a JSON array of rows or a CSV file in the 'file' field."}
+        )
+    return data
+
+
+def bulk_enroll(rows, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Enroll students from `rows` of {student_id, course_id, status}.
+
+    Rows are validated and inserted a chunk at a time: each chunk costs
+    three lookups (students, courses, existing enrollments) and one
+    bulk insert, whatever its size. Returns one result dict per row, in
+    input order, with a status of `enrolled`, `already_enrolled`,
+    `duplicate` or `error`.
+    """
+    row_serializer = BulkEnrollmentRowSerializer()
+    results = [None] * len(rows)
+    seen = set()
+
+    for start in range(0, len(rows), chunk_size):
+        valid = []
+        for index in range(start, min(start + chunk_size, len(rows))):
+            try:
+                data = row_serializer.run_validation(rows[index])
+            except serializers.ValidationError as exc:
+                results[index] = {'row': index, 'status': 'error', 'errors': exc.detail}
+                continue
+            valid.append((index, data))
+
+        student_ids = {data['student_id'] for _, data in valid}
+        course_ids = {data['course_id'] for _, data in valid}
+        students = set(
+            User.objects.filter(id__in=student_ids, role='student').values_list('id', flat=True)
+        )
+        courses = set(Course.objects.filter(id__in=course_ids).values_list('id', flat=True))
+        existing = set(
+            Enrollment.objects.filter(
+                student_id__in=student_ids, course_id__in=course_ids
+            ).values_list('student_id', 'course_id')
+        )
+
+        new_enrollments = {}
+        for index, data in valid:
+            pair = (data['student_id'], data['course_id'])
+            result = {'row': index, 'student_id': pair[0], 'course_id': pair[1]}
+
+            if pair[0] not in students:
+                result.update(status='error', errors={'student_id': "Student not found or not a student."})
+            elif pair[1] not in courses:
+                result.update(status='error', errors={'course_id': "Course not found."})
+            elif pair in existing:
+                result['status'] = 'already_enrolled'
+            elif pair in seen:
+                result['status'] = 'duplicate'
+            else:
+                result['status'] = 'enrolled'
+                seen.add(pair)
+                new_enrollments[pair] = (
+                    result, Enrollment(student_id=pair[0], course_id=pair[1], status=data['status'])
+                )
+            results[index] = result
+
+        with transaction.atomic():
+            new_enrollments = insert_enrollments(new_enrollments)
+            if new_enrollments:
+                emit('enrollment.bulk_created', enrollments=[[e.student_id, e.course_id] for e in new_enrollments])
+                enrollments_counted((e.student_id, e.course_id, e.status) for e in new_enrollments)
+        # bulk_create skips the post_save signals that keep cached course lists and timetables current.
+        bump_versions(student_version_name(e.student_id) for e in new_enrollments)
+        bump_versions([group_version_name('enrollments')])
+        touch_courses(e.course_id for e in new_enrollments)
+        enrollments_changed((e.student_id, e.course_id, e.status) for e in new_enrollments)
+
+    return results
+
+
+def insert_enrollments(pending):
+    """
+    Insert the enrollments of `pending` ({(student_id, course_id): (result,
+    Enrollment)}) and return the ones that were inserted.
+
+    A pair enrolled by a concurrent request after the lookup makes the
+    insert fail; those pairs are re-read, reported as `already_enrolled`
+    and the rest inserted again, so only rows this call wrote are
+    announced and counted. Call it inside a transaction.
+    """
+    while pending:
+        try:
+            with transaction.atomic():
+                return Enrollment.objects.bulk_create([enrollment for _, enrollment in pending.values()])
+        except IntegrityError:
+            taken = set(Enrollment.objects.filter(
+                student_id__in={student_id for student_id, _ in pending},
+                course_id__in={course_id for _, course_id in pending},
+            ).values_list('student_id', 'course_id')) & pending.keys()
+            if not taken:
+                raise
+            for pair in taken:
+                pending.pop(pair)[0]['status'] = 'already_enrolled'
+    return []
+
+
+def start_user_import(rows):
+    """
+    Queue a bulk user import and return its job id.
+    Progress can be read back with get_user_import(job_id).
+    """
+    job_id = uuid.uuid4().hex
+    save_user_import({
+        'job_id': job_id,
+        'status': 'queued',
+        'total': len(rows),
+        'processed': 0,
+        'created': 0,
+        'failed': 0,
+        'errors': [],
+    })
+    transaction.on_commit(lambda: provision_users_job.delay(job_id, rows))
+    return job_id
+
+
+def get_user_import(job_id):
+    return cache.get(USER_IMPORT_JOB_KEY.format(job_id))
+
+
+def save_user_import(job):
+    cache.set(USER_IMPORT_JOB_KEY.format(job['job_id']), job, USER_IMPORT_JOB_TIMEOUT)
+
+
+def provision_users(job_id, rows, chunk_size=USER_IMPORT_CHUNK_SIZE):
+    """
+    Create users from `rows` a chunk at a time, recording progress on the job.
+
+    Each chunk is checked for existing usernames/emails with two set-based
+    queries and inserted with one bulk_create. Passwords are hashed on a
+    thread pool: the PBKDF2 and Argon2 hashers do their work outside the
+    GIL, and Celery's prefork workers cannot start child processes.
+    A bad row is recorded in the job's `errors` and never stops the batch.
+    """
+    job = get_user_import(job_id) or {
+        'job_id': job_id, 'total': len(rows), 'processed': 0, 'created': 0, 'failed': 0, 'errors': [],
+    }
+    job['status'] = 'running'
+    save_user_import(job)
+
+    row_serializer = BulkUserRowSerializer()
+    seen_usernames = set()
+    seen_emails = set()
+    workers = settings.BULK_IMPORT_HASH_WORKERS or os.cpu_count()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(rows), chunk_size):
+            errors = []
+            valid = []
+            for index in range(start, min(start + chunk_size, len(rows))):
+                try:
+                    data = row_serializer.run_validation(rows[index])
+                except serializers.ValidationError as exc:
+                    errors.append({'row': index, 'errors': exc.detail})
+                    continue
+                data['email'] = User.objects.normalize_email(data['email'])
+                valid.append((index, data))
+
+            taken_usernames = set(User.objects.filter(
+                username__in=[data['username'] for _, data in valid]
+            ).values_list('username', flat=True))
+            taken_emails = set(User.objects.filter(
+                email__in=[data['email'] for _, data in valid]
+            ).values_list('email', flat=True))
+
+            accepted = []
+            for index, data in valid:
+                if data['username'] in taken_usernames or data['username'] in seen_usernames:
+                    errors.append({'row': index, 'errors': {'username': ["Username already exists."]}})
+                elif data['email'] in taken_emails or data['email'] in seen_emails:
+                    errors.append({'row': index, 'errors': {'email': ["Email already exists."]}})
+                else:
+                    seen_usernames.add(data['username'])
+                    seen_emails.add(data['email'])
+                    accepted.append((index, data))
+
+            passwords = [generate_random_password() for _ in accepted]
+            hashes = executor.map(make_password, passwords)
+            users = [User(password=hashed, **data) for (_, data), hashed in zip(accepted, hashes)]
+
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create(users)
+            except IntegrityError:
+                errors.extend(
+                    {'row': index, 'errors': {'detail': ["Conflicted with a concurrent change, please retry."]}}
+                    for index, _ in accepted
+                )
+                users = []
+
+            for role, count in Counter(user.role for user in users).items():
+                adjust_role_count(role, count)
+            if users:
+                bump_versions([group_version_name('users')])
+                send_bulk_user_credentials_email.delay([
+                    [user.email, user.username, password] for user, password in zip(users, passwords)
+                ])
+
+            job['processed'] = min(start + chunk_size, len(rows))
+            job['created'] += len(users)
+            job['failed'] += len(errors)
+            job['errors'].extend(sorted(errors, key=lambda error: error['row']))
+            save_user_import(job)
+
+    job['status'] = 'completed'
+    save_user_import(job)
+    return job
@@ -0,0 +1,103 @@
+import csv
+import io
+import zlib
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import User, Enrollment, CourseSchedule
+
+USER_COLUMNS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'department',
+    'enrollment_year', 'batch', 'roll_number', 'joined_date', 'is_active',
+)
+
+# dataset -> (queryset factory, columns passed to values_list())
+EXPORTS = {
+    'students': (lambda: User.objects.filter(role='student'), USER_COLUMNS),
+    'teachers': (lambda: User.objects.filter(role='teacher'), USER_COLUMNS),
+    'enrollments': (lambda: Enrollment.objects.all(), (
+        'id', 'student_id', 'student__username', 'course_id', 'course__title', 'status', 'enrolled_at', 'updated_at',
+    )),
+    'schedules': (lambda: CourseSchedule.objects.all(), (
+        'id', 'course_id', 'course__title', 'teacher_id', 'teacher__username',
+        'day_of_week', 'start_time', 'end_time', 'location',
+    )),
+}
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def export_rows(dataset, chunk_size=None):
+    """
+    Return (header, rows) for `dataset`. Rows are tuples read through a
+    server-side cursor in id order, `chunk_size` at a time, so the table
+    is never loaded whole.
+    """
+    queryset, columns = EXPORTS[dataset]
+    header = [column.replace('__', '_') for column in columns]
+    rows = queryset().order_by('id').values_list(*columns).iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE)
+    return header, rows
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def csv_chunks(header, rows, batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for batch in batches(rows, batch_size):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(header, rows, batch_size):
+    encoder = DjangoJSONEncoder()
+    for batch in batches(rows, batch_size):
+        yield ''.join(encoder.encode(dict(zip(header, row))) + '\n' for row in batch)
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(dataset, file_format='csv', compress=False, chunk_size=None):
+    """Return (chunks, content_type, filename) for a streaming export."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    header, rows = export_rows(dataset, chunk_size)
+    content_type, extension = FORMATS[file_format]
+    chunks = (csv_chunks if file_format == 'csv' else ndjson_chunks)(header, rows, chunk_size)
+    filename = f'{dataset}.{extension}'
+    if compress:
+        return gzip_chunks(chunks), 'application/gzip', f'{filename}.gz'
+    return (chunk.encode() for chunk in chunks), content_type, filename
+
+
+async def async_chunks(chunks):
+    """
+    Iterate `chunks` from an async response, one chunk per call on the
+    sync thread, so an ASGI server streams the export instead of reading
+    the whole generator into memory first.
+    """
+    chunks = iter(chunks)
+    pull = sync_to_async(next)
+    while (chunk := await pull(chunks, None)) is not None:
+        yield chunk
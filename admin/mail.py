@@ -0,0 +1,90 @@
+import smtplib
+import threading
+import time
+
+from celery.signals import worker_process_shutdown, worker_shutdown
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+# Built for Celery's prefork pool, where each worker process runs one task
+# at a time and so keeps one connection. Under the threads or gevent pools
+# every thread (or greenlet) gets a connection of its own, so concurrent
+# tasks never share a socket; all of them are closed at worker shutdown.
+_local = threading.local()
+_open_connections = set()
+_open_connections_lock = threading.Lock()
+
+
+def build_message(subject, body, recipient, from_email='noreply@example.com'):
+    return EmailMessage(subject, body, from_email, [recipient])
+
+
+def get_mail_connection():
+    """
+    Return this worker's mail connection, opening it if needed.
+
+    The connection stays open between tasks. If it has been idle for longer
+    than MAIL_CONNECTION_IDLE_TIMEOUT it is checked with a NOOP first, and
+    reopened if the server already hung up.
+    """
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        connection = _local.connection = get_connection(fail_silently=False)
+        _local.last_used = 0.0
+        with _open_connections_lock:
+            _open_connections.add(connection)
+
+    smtp = getattr(connection, 'connection', None)
+    if smtp is not None and time.monotonic() - _local.last_used > settings.MAIL_CONNECTION_IDLE_TIMEOUT:
+        try:
+            if smtp.noop()[0] != 250:
+                raise smtplib.SMTPServerDisconnected('NOOP failed')
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    connection.open()
+    return connection
+
+
+def send_messages(messages):
+    """
+    Send all `messages` over the worker's shared connection in one batch.
+    Returns the number of messages sent.
+    """
+    if not messages:
+        return 0
+
+    connection = get_mail_connection()
+    try:
+        return connection.send_messages(messages)
+    except (smtplib.SMTPServerDisconnected, OSError):
+        # Drop the broken connection so the next task starts a fresh one.
+        close_mail_connection()
+        raise
+    finally:
+        _local.last_used = time.monotonic()
+
+
+def close_mail_connection():
+    """Close the calling thread's connection."""
+    connection = getattr(_local, 'connection', None)
+    if connection is not None:
+        _local.connection = None
+        with _open_connections_lock:
+            _open_connections.discard(connection)
+        connection.close()
+
+
+def close_all_mail_connections(**kwargs):
+    with _open_connections_lock:
+        connections = list(_open_connections)
+        _open_connections.clear()
+    for connection in connections:
+        connection.close()
+    _local.connection = None
+
+
+# worker_process_shutdown only fires in prefork children; worker_shutdown
+# covers the threads and gevent pools, which run in the main process.
+worker_process_shutdown.connect(close_all_mail_connections)
+worker_shutdown.connect(close_all_mail_connections)
@@ -2,7 +2,13 @@
 from rest_framework import serializers
 from core.models import User
 from core.models import Course, User, CourseTeacher , CourseSchedule , Enrollment
-from .task import send_user_credentials_email 
+from .task import send_user_credentials_email
+from core.outbox import emit_many
+from django.db import IntegrityError, transaction
+from core.versioning import bump_versions, course_version_name, group_version_name
+from core.timetable import teachers_assigned
+from core.conditional import touch_courses
+from core.scheduling import Slot, booked_conflicts, describe_conflict
 import random, string
 
 def generate_random_password(length=8):
@@ -67,17 +73,18 @@ class CourseSerializer(serializers.ModelSerializer):
         return [en.student.username for en in obj.enrollments.all()]    
 
 
+    @transaction.atomic
     def create(self, validated_data):
         teachers = validated_data.pop('teachers', None)
         course = Course.objects.create(**validated_data)
 
         if teachers:
-            for teacher in teachers:
-                CourseTeacher.objects.create(course=course, teacher=teacher)
+            self.sync_teachers(course, teachers)
 
         return course
 
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         teachers = validated_data.pop('teachers', None)
 
@@ -87,11 +94,57 @@ class CourseSerializer(serializers.ModelSerializer):
         instance.save()
 
         if teachers is not None:  
-            instance.teachers.clear()
-            for teacher in teachers:
-                CourseTeacher.objects.create(course=instance, teacher=teacher)
+            self.sync_teachers(instance, teachers)
 
         return instance                
+
+    def sync_teachers(self, course, teachers):
+        """
+        Make the course's teachers match `teachers`, touching only the rows
+        that changed. Existing assignments keep their `assigned_at`, and only
+        newly added teachers get an assignment email.
+        """
+        wanted = {teacher.id for teacher in teachers}
+        current = set(
+            CourseTeacher.objects.filter(course=course).values_list('teacher_id', flat=True)
+        )
+
+        removed = current - wanted
+        if removed:
+            CourseTeacher.objects.filter(course=course, teacher_id__in=removed).delete()
+
+        added = {teacher.id: teacher for teacher in teachers if teacher.id not in current}.values()
+        CourseTeacher.objects.bulk_create(
+            [CourseTeacher(course=course, teacher=teacher) for teacher in added],
+            ignore_conflicts=True
+        )
+        if added:
+            # bulk_create skips the post_save signals that keep cached course data and timetables current.
+            bump_versions([course_version_name(course.id), group_version_name('course_teachers')])
+            touch_courses([course.id])
+            teachers_assigned(course.id, [teacher.id for teacher in added])
+
+        emit_many('course.teacher_assigned', [{'teacher_id': teacher.id, 'course_id': course.id} for teacher in added])
+
+
+class CourseReadSerializer(serializers.ModelSerializer):
+    """
+    Read-only course representation built from the flat username lists
+    attached by CourseViewSet, so serializing never touches the database.
+    """
+    teachers = serializers.SerializerMethodField()
+    students = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Course
+        fields = ['id', 'title', 'description', 'duration', 'teachers', 'students', 'created_at', 'updated_at']
+
+    def get_teachers(self, obj):
+        return obj.teacher_usernames
+
+    def get_students(self, obj):
+        return obj.student_usernames
+
      
 class TeacherListSerializer(serializers.ModelSerializer):
     class Meta:
@@ -139,6 +192,50 @@ class CourseScheduleSerializerAdmin(serializers.ModelSerializer):
         model = CourseSchedule
         fields = ['id', 'course', 'course_title','teacher', 'teacher_name',  'day_of_week', 'start_time', 'end_time', 'location']
 
+    def validate(self, attrs):
+        # Partial updates only send the changed fields.
+        def value(field):
+            if field in attrs:
+                return attrs[field]
+            return getattr(self.instance, field, None)
+
+        start_time, end_time = value('start_time'), value('end_time')
+        if start_time >= end_time:
+            raise serializers.ValidationError({"end_time": "End time must be after start time."})
+
+        slot = Slot(
+            id=getattr(self.instance, 'pk', None),
+            course_id=value('course').pk,
+            teacher_id=value('teacher').pk,
+            day_of_week=value('day_of_week'),
+            start_time=start_time,
+            end_time=end_time,
+            location=value('location'),
+        )
+        conflicts = booked_conflicts(slot)
+        if conflicts:
+            raise serializers.ValidationError(
+                {"non_field_errors": [describe_conflict(conflict) for conflict in conflicts]}
+            )
+        return attrs
+
+    def save_slot(self, save, *args):
+        # A booking saved after validate() ran still hits the database's
+        # no-overlap constraints (core migration 0014).
+        try:
+            with transaction.atomic():
+                return save(*args)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"non_field_errors": ["This slot clashes with a booking saved at the same time."]}
+            )
+
+    def create(self, validated_data):
+        return self.save_slot(super().create, validated_data)
+
+    def update(self, instance, validated_data):
+        return self.save_slot(super().update, instance, validated_data)
+
 
 class EnrollmentSerializer(serializers.ModelSerializer):
     student_id = serializers.IntegerField(write_only=True)
@@ -185,4 +282,29 @@ class AssignTeacherSerializer(serializers.Serializer):
         except User.DoesNotExist:
             raise serializers.ValidationError("Teacher not found or not a teacher.")
         return value
-    
\ No newline at end of file
+    
+
+class BulkEnrollmentRowSerializer(serializers.Serializer):
+    student_id = serializers.IntegerField()
+    course_id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=Enrollment.STATUS_CHOICES, default='active')
+
+
+class BulkUserRowSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = [
+            'username', 'email', 'role', 'first_name', 'last_name',
+            'department', 'enrollment_year', 'batch', 'roll_number'
+        ]
+        # Uniqueness is checked for the whole chunk at once in admin.bulk.
+        extra_kwargs = {
+            'username': {'validators': []},
+            'email': {'validators': []},
+        }
+
+    def validate_role(self, value):
+        allowed_roles = ['student', 'teacher']
+        if value not in allowed_roles:
+            raise serializers.ValidationError(f"Role must be one of {allowed_roles}")
+        return value
@@ -1,20 +1,12 @@
 from celery import shared_task
-from django.core.mail import send_mail
 from django.conf import settings
-from core.models import User, Course, Notification
-
-def create_notification(user, title, message, notif_type='general', related_course=None):
-    Notification.objects.create(
-        user=user,
-        title=title,
-        message=message,
-        notif_type=notif_type,
-        related_course=related_course,
-        email_sent=True
-    )
+from core.models import User, Course, TeacherDigestEntry
+from core.notifications import build_notification, fan_out
+from core.outbox import deliver, handles, relay
+from .digest import send_due_digests
+from .mail import build_message, send_messages
 
-@shared_task
-def send_user_credentials_email(email, username, password):
+def credentials_message(email, username, password):
     subject = "Your Account Credentials"
     message = f"""
 Hello {username},
@@ -27,67 +19,167 @@ Password: {password}
 
 Please login and change your password after first login.
 """
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [email],
-        fail_silently=False,
-    )
+    return subject, message
 
-    user = User.objects.get(email=email)
-    create_notification(user, subject, message, notif_type='credentials')
+@shared_task
+def send_user_credentials_email(email, username, password):
+    send_bulk_user_credentials_email([[email, username, password]])
 
 @shared_task
-def send_enrollment_email(student_id, course_id):
-    student = User.objects.get(id=student_id)
-    course = Course.objects.get(id=course_id)
-    
-    subject_student = f"Enrolled in {course.title}"
-    message_student = f"Hello {student.username},\n\nYou have been successfully enrolled in the course: {course.title}."
-    send_mail(subject_student, message_student, 'noreply@example.com', [student.email])
-    
+def send_bulk_user_credentials_email(credentials):
+    """
+    Send the credentials emails for a chunk of users over one connection.
+    `credentials` is a list of [email, username, password] triples.
+    """
+    contents = [credentials_message(*triple) for triple in credentials]
+    send_messages([
+        build_message(subject, message, email, settings.DEFAULT_FROM_EMAIL)
+        for (email, _, _), (subject, message) in zip(credentials, contents)
+    ])
+
+    users = User.objects.in_bulk([email for email, _, _ in credentials], field_name='email')
+    fan_out([
+        build_notification(users[email], subject, message, notif_type='credentials')
+        for (email, _, _), (subject, message) in zip(credentials, contents)
+        if email in users
+    ])
+
+@shared_task
+def provision_users_job(job_id, rows):
+    from .bulk import get_user_import, provision_users, save_user_import
+
     try:
-        create_notification(student, subject_student, message_student, notif_type='enrollment', related_course=course)
-    except Exception as e:
-        print(f"Failed to create notification for student {student.id}: {e}")
-    
-    for teacher in course.teachers.all():
-        subject_teacher = f"New Student Enrolled in {course.title}"
-        message_teacher = f"Hello {teacher.username},\n\nStudent {student.username} has enrolled in your course: {course.title}."
-        send_mail(subject_teacher, message_teacher, 'noreply@example.com', [teacher.email])
-        
-        try:
-            create_notification(teacher, subject_teacher, message_teacher, notif_type='enrollment', related_course=course)
-        except Exception as e:
-            print(f"Failed to create notification for teacher {teacher.id}: {e}")
+        return provision_users(job_id, rows)
+    except Exception:
+        job = get_user_import(job_id)
+        if job:
+            job['status'] = 'failed'
+            save_user_import(job)
+        raise
+
+NOTICE_CHUNK_SIZE = 500
+
+def send_enrollment_notices(enrollments, enrolled=True):
+    """
+    Email and notify the student and every teacher for each
+    [student_id, course_id] pair in `enrollments`.
+
+    Each chunk loads its students, courses and teachers with three queries,
+    sends its emails as one batch and writes its notifications with one
+    bulk_create, so cost does not grow with the number of co-teachers.
+
+    With TEACHER_DIGEST_WINDOW set, teachers are not notified here: their
+    part is buffered and sent later as one digest per course (admin.digest).
+    """
+    digest = settings.TEACHER_DIGEST_WINDOW > 0
+    for start in range(0, len(enrollments), NOTICE_CHUNK_SIZE):
+        chunk = enrollments[start:start + NOTICE_CHUNK_SIZE]
+        students = User.objects.in_bulk({student_id for student_id, _ in chunk})
+        courses = Course.objects.prefetch_related('teachers').in_bulk({course_id for _, course_id in chunk})
+        notif_type = 'enrollment' if enrolled else 'unenrollment'
+
+        messages = []
+        notifications = []
+        digest_entries = []
+        for student_id, course_id in chunk:
+            student = students.get(student_id)
+            course = courses.get(course_id)
+            if student is None or course is None:
+                continue
+
+            if enrolled:
+                subject_student = f"Enrolled in {course.title}"
+                message_student = f"Hello {student.username},\n\nYou have been successfully enrolled in the course: {course.title}."
+            else:
+                subject_student = f"Removed from {course.title}"
+                message_student = f"Hello {student.username},\n\nYou have been removed from the course: {course.title}."
+            messages.append(build_message(subject_student, message_student, student.email))
+            notifications.append(build_notification(student, subject_student, message_student, notif_type, course))
+
+            for teacher in course.teachers.all():
+                if digest:
+                    digest_entries.append(
+                        TeacherDigestEntry(teacher=teacher, course=course, student=student, enrolled=enrolled)
+                    )
+                    continue
+                if enrolled:
+                    subject_teacher = f"New Student Enrolled in {course.title}"
+                    message_teacher = f"Hello {teacher.username},\n\nStudent {student.username} has enrolled in your course: {course.title}."
+                else:
+                    subject_teacher = f"Student Removed from {course.title}"
+                    message_teacher = f"Hello {teacher.username},\n\nStudent {student.username} has been removed from your course: {course.title}."
+                messages.append(build_message(subject_teacher, message_teacher, teacher.email))
+                notifications.append(build_notification(teacher, subject_teacher, message_teacher, notif_type, course))
+
+        send_messages(messages)
+        fan_out(notifications)
+        TeacherDigestEntry.objects.bulk_create(digest_entries)
+
+@shared_task
+def send_enrollment_email(student_id, course_id):
+    send_enrollment_notices([[student_id, course_id]])
       
+@shared_task
+def send_bulk_enrollment_email(enrollments):
+    """
+    Send the enrollment emails for a whole bulk upload from one task.
+    `enrollments` is a list of [student_id, course_id] pairs.
+    """
+    send_enrollment_notices(enrollments)
+
 @shared_task
 def send_unenrollment_email(student_id, course_id):
-    student = User.objects.get(id=student_id)
-    course = Course.objects.get(id=course_id)
-    
-    subject_student = f"Removed from {course.title}"
-    message_student = f"Hello {student.username},\n\nYou have been removed from the course: {course.title}."
-    send_mail(subject_student, message_student, 'noreply@example.com', [student.email])
-    create_notification(student, subject_student, message_student, notif_type='unenrollment', related_course=course)
-    
-    for teacher in course.teachers.all():
-        subject_teacher = f"Student Removed from {course.title}"
-        message_teacher = f"Hello {teacher.username},\n\nStudent {student.username} has been removed from your course: {course.title}."
-        send_mail(subject_teacher, message_teacher, 'noreply@example.com', [teacher.email])
-        create_notification(teacher, subject_teacher, message_teacher, notif_type='unenrollment', related_course=course)
+    send_enrollment_notices([[student_id, course_id]], enrolled=False)
 
 @shared_task
 def send_teacher_assignment_email(teacher_id, course_id):
     teacher = User.objects.get(id=teacher_id)
     course = Course.objects.get(id=course_id)
-    
+    send_teacher_assignment_notice(teacher, course)
+
+def send_teacher_assignment_notice(teacher, course):
     subject = f"You have been assigned to {course.title}"
     message = f"""
 Hello {teacher.username},
 
 You have been assigned to teach the course: {course.title}.
 """
-    send_mail(subject, message, 'noreply@example.com', [teacher.email], fail_silently=False)
-    create_notification(teacher, subject, message, notif_type='course', related_course=course)
+    send_messages([build_message(subject, message, teacher.email)])
+    fan_out([build_notification(teacher, subject, message, notif_type='course', related_course=course)])
+
+
+# Outbox consumers. They may see an event more than once across a crash,
+# and the rows they refer to may be gone by the time they run.
+
+@handles('enrollment.created')
+def enrollment_created(student_id, course_id):
+    send_enrollment_notices([[student_id, course_id]])
+
+@handles('enrollment.bulk_created')
+def enrollments_created(enrollments):
+    send_enrollment_notices(enrollments)
+
+@handles('enrollment.removed')
+def enrollment_removed(student_id, course_id):
+    send_enrollment_notices([[student_id, course_id]], enrolled=False)
+
+@handles('course.teacher_assigned')
+def teacher_assigned(teacher_id, course_id):
+    teacher = User.objects.filter(id=teacher_id).first()
+    course = Course.objects.filter(id=course_id).first()
+    if teacher is not None and course is not None:
+        send_teacher_assignment_notice(teacher, course)
+
+@shared_task
+def deliver_outbox_events(event_ids):
+    return deliver(event_ids)
+
+@shared_task
+def relay_outbox(max_batches=None):
+    """Send every pending outbox event to the workers, a batch per task."""
+    return relay(deliver_outbox_events.delay, max_batches=max_batches)
+
+@shared_task
+def flush_teacher_digests():
+    """Send the teacher digests that have waited TEACHER_DIGEST_WINDOW seconds."""
+    return send_due_digests()
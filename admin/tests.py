@@ -1,2 +1,655 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import threading
+from datetime import timedelta
+from unittest import mock
 
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.middleware import QueryRecorder, query_stats
+from core.models import (
+    User, Course, CourseTeacher, CourseSchedule, Enrollment, Notification, OutboxEvent, TeacherDigestEntry,
+)
+from core.outbox import deliver, relay
+from core.stats import enrollment_stats
+from user.authentication import add_user_claims
+from . import bulk
+
+
+class CourseViewSetQueryCountTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass', role='teacher')
+        self.students = User.objects.bulk_create([
+            User(username=f'student{i}', email=f'student{i}@example.com', role='student')
+            for i in range(5)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def add_courses(self, count):
+        courses = Course.objects.bulk_create([
+            Course(title=f'Course {Course.objects.count() + i}', description='', duration=10)
+            for i in range(count)
+        ])
+        CourseTeacher.objects.bulk_create([
+            CourseTeacher(course=course, teacher=self.teacher) for course in courses
+        ])
+        Enrollment.objects.bulk_create([
+            Enrollment(course=course, student=student)
+            for course in courses for student in self.students
+        ])
+
+    def count_queries(self, url):
+        # add_courses() uses bulk_create, which skips the signals that invalidate cached responses.
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_list_query_count_is_constant(self):
+        self.add_courses(10)
+        small, response = self.count_queries(reverse('course-list'))
+        self.assertEqual(len(response.data), 10)
+
+        self.add_courses(9990)
+        large, response = self.count_queries(reverse('course-list'))
+        self.assertEqual(len(response.data), 10000)
+
+        self.assertEqual(small, large)
+
+    def test_retrieve_returns_usernames(self):
+        self.add_courses(1)
+        course = Course.objects.get()
+        queries, response = self.count_queries(reverse('course-detail', args=[course.id]))
+
+        self.assertEqual(queries, 3)
+        self.assertEqual(response.data['teachers'], ['teacher'])
+        self.assertEqual(response.data['students'], [s.username for s in self.students])
+
+
+class UserListViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        for i in range(3):
+            User.objects.create_user(f'teacher{i}', f'teacher{i}@example.com', 'pass', role='teacher')
+        for i in range(5):
+            User.objects.create_user(f'student{i}', f'student{i}@example.com', 'pass', role='student')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_pages_follow_the_cursor(self):
+        url = reverse('admin-user-list')
+        response = self.client.get(url, {'page_size': 4})
+
+        self.assertEqual(response.data['total_students'], 5)
+        self.assertEqual(response.data['total_teachers'], 3)
+        self.assertEqual(response.data['count'], 9)
+        self.assertEqual(len(response.data['results']), 4)
+
+        usernames = [u['username'] for u in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            usernames += [u['username'] for u in response.data['results']]
+        self.assertEqual(usernames, list(User.objects.order_by('id').values_list('username', flat=True)))
+
+    def test_role_counts_follow_saves_and_deletes(self):
+        url = reverse('admin-user-list')
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user('student5', 'student5@example.com', 'pass', role='student')
+            User.objects.filter(username='teacher0').delete()
+            promoted = User.objects.get(username='student0')
+            promoted.role = 'teacher'
+            promoted.save()
+            # A save that keeps the role leaves the counts cached.
+            renamed = User.objects.get(username='student1')
+            renamed.first_name = 'Ada'
+            renamed.save()
+
+        # Writes that roll back never reach the counts.
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            User.objects.create_user('student6', 'student6@example.com', 'pass', role='student')
+            transaction.set_rollback(True)
+
+        # The counts were adjusted in the cache, not counted again.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'role': 'student'})
+        self.assertEqual(response.data['total_students'], 5)
+        self.assertEqual(response.data['total_teachers'], 3)
+        self.assertEqual(response.data['count'], 5)
+
+
+class BulkEnrollStudentsViewTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.student = User.objects.create_user('student', 'student@example.com', 'pass', role='student')
+        self.other = User.objects.create_user('other', 'other@example.com', 'pass', role='student')
+        self.teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass', role='teacher')
+        self.course = Course.objects.create(title='Algebra', description='', duration=10)
+        Enrollment.objects.create(student=self.other, course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_json_rows_get_a_per_row_report(self):
+        rows = [
+            {'student_id': self.student.id, 'course_id': self.course.id},
+            {'student_id': self.student.id, 'course_id': self.course.id},
+            {'student_id': self.other.id, 'course_id': self.course.id},
+            {'student_id': self.teacher.id, 'course_id': self.course.id},
+            {'student_id': self.student.id, 'course_id': 0},
+            {'student_id': 'x', 'course_id': self.course.id},
+        ]
+        response = self.client.post(reverse('bulk-enroll-students'), rows, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [r['status'] for r in response.data['results']],
+            ['enrolled', 'duplicate', 'already_enrolled', 'error', 'error', 'error']
+        )
+        self.assertTrue(Enrollment.objects.filter(student=self.student, course=self.course).exists())
+        [event] = OutboxEvent.objects.exclude(topic='enrollment.stats')
+        self.assertEqual((event.topic, event.payload), (
+            'enrollment.bulk_created', {'enrollments': [[self.student.id, self.course.id]]}
+        ))
+
+    def test_rows_enrolled_concurrently_are_reported_and_not_counted(self):
+        third = User.objects.create_user('third', 'third@example.com', 'pass', role='student')
+        insert_enrollments = bulk.insert_enrollments
+
+        def racing_insert(pending):
+            # Another request enrolls the student between the lookup and the insert.
+            Enrollment.objects.create(student=self.student, course=self.course)
+            return insert_enrollments(pending)
+
+        rows = [
+            {'student_id': self.student.id, 'course_id': self.course.id},
+            {'student_id': third.id, 'course_id': self.course.id},
+        ]
+        with mock.patch('admin.bulk.insert_enrollments', side_effect=racing_insert):
+            response = self.client.post(reverse('bulk-enroll-students'), rows, format='json')
+
+        self.assertEqual([r['status'] for r in response.data['results']], ['already_enrolled', 'enrolled'])
+        self.assertEqual(response.data['summary']['already_enrolled'], 1)
+        [event] = OutboxEvent.objects.filter(topic='enrollment.bulk_created')
+        self.assertEqual(event.payload, {'enrollments': [[third.id, self.course.id]]})
+        with self.captureOnCommitCallbacks(execute=True):
+            relay(deliver)
+        self.assertEqual(enrollment_stats('course')[str(self.course.id)]['total'], 3)
+
+    def test_csv_upload(self):
+        upload = SimpleUploadedFile(
+            'rows.csv',
+            f'student_id,course_id,status\n{self.student.id},{self.course.id},completed\n'.encode()
+        )
+        response = self.client.post(reverse('bulk-enroll-students'), {'file': upload}, format='multipart')
+
+        self.assertEqual(response.data['summary']['enrolled'], 1)
+        self.assertEqual(Enrollment.objects.get(student=self.student).status, 'completed')
+
+
+class BulkCreateUsersTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        User.objects.create_user('taken', 'taken@example.com', 'pass', role='student')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    @mock.patch('admin.bulk.send_bulk_user_credentials_email')
+    @mock.patch('admin.bulk.provision_users_job')
+    def test_import_reports_progress_and_row_errors(self, job_task, email_task):
+        from admin.bulk import provision_users
+        job_task.delay.side_effect = provision_users
+
+        rows = [
+            {'username': 'new1', 'email': 'new1@example.com', 'role': 'student'},
+            {'username': 'new2', 'email': 'new2@example.com', 'role': 'teacher'},
+            {'username': 'taken', 'email': 'other@example.com'},
+            {'username': 'new3', 'email': 'new1@example.com'},
+            {'username': 'new4', 'email': 'new4@example.com', 'role': 'admin'},
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin-bulk-create-users'), rows, format='json')
+        self.assertEqual(response.status_code, 202)
+
+        job = self.client.get(response.data['status_url']).data
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual((job['processed'], job['created'], job['failed']), (5, 2, 3))
+        self.assertEqual([error['row'] for error in job['errors']], [2, 3, 4])
+
+        new1 = User.objects.get(username='new1')
+        self.assertTrue(new1.password)
+        email_task.delay.assert_called_once()
+        self.assertEqual([c[1] for c in email_task.delay.call_args[0][0]], ['new1', 'new2'])
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.students = [
+            User.objects.create_user(f'student{i}', f'student{i}@example.com', 'pass', role='student', batch='A')
+            for i in range(5)
+        ]
+        self.course = Course.objects.create(title='Algebra', description='', duration=10)
+        for student in self.students[:3]:
+            Enrollment.objects.create(student=student, course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.token = f'Bearer {add_user_claims(RefreshToken.for_user(self.admin), self.admin).access_token}'
+
+    def export(self, dataset, **params):
+        response = self.client.get(reverse('admin-export', args=[dataset]), params, HTTP_ACCEPT='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_streams_csv(self):
+        response, body = self.export('students')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('filename="students.csv"', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual([row['username'] for row in rows], [student.username for student in self.students])
+        self.assertEqual(rows[0]['batch'], 'A')
+
+    def test_streams_gzipped_ndjson(self):
+        response, body = self.export('enrollments', **{'as': 'ndjson', 'compress': 'gzip'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('filename="enrollments.ndjson.gz"', response['Content-Disposition'])
+        rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+        self.assertEqual([row['student_username'] for row in rows], ['student0', 'student1', 'student2'])
+        self.assertEqual({row['course_title'] for row in rows}, {'Algebra'})
+
+    async def test_streams_asynchronously_under_asgi(self):
+        response = await AsyncClient().get(
+            reverse('admin-export', args=['students']), headers={'authorization': self.token, 'accept': 'text/csv'}
+        )
+        self.assertEqual(response.status_code, 200)
+        # An async iterator, so Django does not collect the export into a list first.
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual([row['username'] for row in rows], [student.username for student in self.students])
+
+    def test_rejects_unknown_datasets_and_formats(self):
+        self.assertEqual(self.client.get(reverse('admin-export', args=['courses'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('admin-export', args=['students']), {'as': 'xml'}).status_code, 400)
+        student = APIClient()
+        student.force_authenticate(self.students[0])
+        self.assertEqual(student.get(reverse('admin-export', args=['students'])).status_code, 403)
+
+
+@override_settings(TEACHER_DIGEST_WINDOW=0)
+class EnrollmentNoticeTests(TestCase):
+    def setUp(self):
+        from admin import mail as mail_layer
+        mail_layer.close_mail_connection()
+        self.student = User.objects.create_user('student', 'student@example.com', 'pass', role='student')
+        self.course = Course.objects.create(title='Algebra', description='', duration=10)
+        for i in range(3):
+            teacher = User.objects.create_user(f'teacher{i}', f'teacher{i}@example.com', 'pass', role='teacher')
+            CourseTeacher.objects.create(course=self.course, teacher=teacher)
+
+    def test_tasks_share_one_connection(self):
+        from django.core import mail
+        from admin.task import send_enrollment_email, send_unenrollment_email
+
+        with mock.patch('admin.mail.get_connection', wraps=mail.get_connection) as get_connection:
+            send_enrollment_email(self.student.id, self.course.id)
+            send_unenrollment_email(self.student.id, self.course.id)
+
+        get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 8)
+        self.assertEqual(mail.outbox[0].to, ['student@example.com'])
+
+    def test_threads_do_not_share_a_connection(self):
+        from admin import mail as mail_layer
+
+        connections = [mail_layer.get_mail_connection()]
+        thread = threading.Thread(target=lambda: connections.append(mail_layer.get_mail_connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(connections[0], connections[1])
+        self.assertIs(mail_layer.get_mail_connection(), connections[0])
+
+        mail_layer.close_all_mail_connections()
+        self.assertFalse(mail_layer._open_connections)
+
+    def test_query_count_does_not_grow_with_teachers(self):
+        from core.models import Notification
+        from admin.task import send_enrollment_email
+
+        # Three lookups, then the insert and one unread-counter update in a savepoint.
+        with self.assertNumQueries(7):
+            send_enrollment_email(self.student.id, self.course.id)
+
+        for i in range(3, 30):
+            teacher = User.objects.create_user(f'teacher{i}', f'teacher{i}@example.com', 'pass', role='teacher')
+            CourseTeacher.objects.create(course=self.course, teacher=teacher)
+        with self.assertNumQueries(7):
+            send_enrollment_email(self.student.id, self.course.id)
+
+        self.assertEqual(Notification.objects.filter(notif_type='enrollment').count(), 4 + 31)
+
+
+@override_settings(TEACHER_DIGEST_WINDOW=60)
+class TeacherDigestTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(title='Algebra', description='', duration=10)
+        self.teachers = [
+            User.objects.create_user(f'teacher{i}', f'teacher{i}@example.com', 'pass', role='teacher') for i in range(2)
+        ]
+        for teacher in self.teachers:
+            CourseTeacher.objects.create(course=self.course, teacher=teacher)
+        self.students = User.objects.bulk_create([
+            User(username=f'student{i}', email=f'student{i}@example.com', role='student') for i in range(300)
+        ])
+
+    def test_a_burst_becomes_one_digest_per_teacher(self):
+        from django.core import mail
+        from admin.digest import send_due_digests
+        from admin.task import send_bulk_enrollment_email, send_enrollment_email, send_unenrollment_email
+
+        send_bulk_enrollment_email([[student.id, self.course.id] for student in self.students])
+        # student0 leaves again within the window; student1 leaves and comes back.
+        send_unenrollment_email(self.students[0].id, self.course.id)
+        send_unenrollment_email(self.students[1].id, self.course.id)
+        send_enrollment_email(self.students[1].id, self.course.id)
+        self.assertEqual(len(mail.outbox), 303)
+        self.assertTrue(all(message.to[0].startswith('student') for message in mail.outbox))
+
+        # Nothing is due until the window has passed.
+        self.assertEqual(send_due_digests(), 0)
+        mail.outbox = []
+        self.assertEqual(send_due_digests(now=timezone.now() + timedelta(seconds=61)), 2)
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['teacher0@example.com', 'teacher1@example.com'])
+        body = mail.outbox[0].body
+        self.assertIn("299 student(s) enrolled", body)
+        self.assertIn("  - student1\n", body)
+        self.assertNotIn("  - student0\n", body)
+        self.assertEqual(Notification.objects.filter(user=self.teachers[0]).count(), 1)
+        self.assertEqual(send_due_digests(now=timezone.now() + timedelta(seconds=61)), 0)
+
+    def test_groups_are_never_split_and_repeats_do_not_flip(self):
+        from django.core import mail
+        from admin import digest
+        from admin.task import send_enrollment_email, send_unenrollment_email
+
+        # A repeated enroll event must not cancel the student out.
+        send_enrollment_email(self.students[0].id, self.course.id)
+        send_enrollment_email(self.students[0].id, self.course.id)
+        send_enrollment_email(self.students[1].id, self.course.id)
+        send_unenrollment_email(self.students[1].id, self.course.id)
+        send_unenrollment_email(self.students[2].id, self.course.id)
+        mail.outbox = []
+
+        with mock.patch.object(digest, 'DIGEST_FLUSH_GROUPS', 1):
+            self.assertEqual(digest.send_due_digests(now=timezone.now() + timedelta(seconds=61)), 2)
+        for message in mail.outbox:
+            self.assertIn("1 student(s) enrolled in your course Algebra:\n  - student0\n", message.body)
+            self.assertIn("1 student(s) were removed from your course Algebra:\n  - student2", message.body)
+        self.assertFalse(TeacherDigestEntry.objects.exists())
+
+
+class CourseTeacherSyncTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.teachers = [
+            User.objects.create_user(f'teacher{i}', f'teacher{i}@example.com', 'pass', role='teacher')
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_update_only_touches_changed_teachers(self):
+        response = self.client.post(reverse('course-list'), {
+            'title': 'Algebra', 'description': 'Basics', 'duration': 10, 'teachers': ['teacher0', 'teacher1'],
+        }, format='json')
+        course_id = response.data['id']
+        kept = CourseTeacher.objects.get(course_id=course_id, teacher=self.teachers[0])
+        self.assertEqual(OutboxEvent.objects.filter(topic='course.teacher_assigned').count(), 2)
+
+        OutboxEvent.objects.all().delete()
+        self.client.patch(reverse('course-detail', args=[course_id]), {
+            'teachers': ['teacher0', 'teacher2'],
+        }, format='json')
+
+        self.assertEqual(
+            set(CourseTeacher.objects.filter(course_id=course_id).values_list('teacher__username', flat=True)),
+            {'teacher0', 'teacher2'}
+        )
+        unchanged = CourseTeacher.objects.get(course_id=course_id, teacher=self.teachers[0])
+        self.assertEqual((unchanged.id, unchanged.assigned_at), (kept.id, kept.assigned_at))
+        [event] = OutboxEvent.objects.all()
+        self.assertEqual(event.payload, {'teacher_id': self.teachers[2].id, 'course_id': course_id})
+
+
+class ScheduleConflictTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass', role='teacher')
+        self.other = User.objects.create_user('other', 'other@example.com', 'pass', role='teacher')
+        self.course = Course.objects.create(title='Algebra', description='Basics', duration=10)
+        self.booked = CourseSchedule.objects.create(
+            course=self.course, teacher=self.teacher, day_of_week=0,
+            start_time='09:00', end_time='10:30', location='Room 1',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def post(self, **overrides):
+        data = {
+            'course': self.course.id, 'teacher': self.other.id, 'day_of_week': 0,
+            'start_time': '10:30', 'end_time': '11:30', 'location': 'Room 2', **overrides,
+        }
+        return self.client.post(reverse('course-schedule-list'), data, format='json')
+
+    def test_rejects_teacher_and_location_overlaps(self):
+        self.assertEqual(self.post().status_code, 201)
+
+        response = self.post(teacher=self.teacher.id, start_time='10:00')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Teacher is already booked", response.data['non_field_errors'][0])
+
+        response = self.post(start_time='08:00', end_time='09:30', location='room 1')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Location 'Room 1'", response.data['non_field_errors'][0])
+
+    def test_concurrent_booking_is_a_validation_error(self):
+        # The check passed, but the no-overlap constraint rejects the insert.
+        with mock.patch.object(CourseSchedule.objects, 'create', side_effect=IntegrityError):
+            response = self.post()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("clashes with a booking", response.data['non_field_errors'][0])
+
+        self.assertEqual(self.post(start_time='12:00', end_time='11:00').status_code, 400)
+
+    def test_rooms_match_ignoring_stored_padding(self):
+        CourseSchedule.objects.filter(pk=self.booked.pk).update(location=' Room 1 ')
+        response = self.post(start_time='10:00', location='room 1')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Location ' Room 1 '", response.data['non_field_errors'][0])
+
+    def test_moving_a_slot_ignores_its_own_booking(self):
+        response = self.client.patch(
+            reverse('course-schedule-detail', args=[self.booked.id]), {'end_time': '11:00'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_audit_reports_existing_overlaps(self):
+        call_command('audit_schedules', stdout=io.StringIO())
+
+        CourseSchedule.objects.create(
+            course=self.course, teacher=self.other, day_of_week=0,
+            start_time='10:00', end_time='11:00', location='Room 1',
+        )
+        with self.assertRaises(CommandError):
+            call_command('audit_schedules', stdout=io.StringIO())
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass', role='teacher')
+        self.course = Course.objects.create(title='Algebra', description='Basics', duration=10)
+        CourseTeacher.objects.create(course=self.course, teacher=self.teacher)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_repeated_reads_are_served_from_cache(self):
+        urls = [
+            reverse('course-list'), reverse('course-detail', args=[self.course.id]),
+            reverse('teachers-list'), reverse('teachers-detail', args=[self.teacher.id]),
+            reverse('students-list'), reverse('course-schedule-list'),
+        ]
+        for url in urls:
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(first.json(), second.json())
+
+    def test_changes_invalidate_cached_responses(self):
+        url = reverse('course-detail', args=[self.course.id])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            student = User.objects.create_user('student', 'student@example.com', 'pass', role='student')
+            Enrollment.objects.create(student=student, course=self.course)
+        self.assertEqual(self.client.get(url).data['students'], ['student'])
+
+        self.client.get(reverse('teachers-detail', args=[self.teacher.id]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.title = 'Geometry'
+            self.course.save()
+        response = self.client.get(reverse('teachers-detail', args=[self.teacher.id]))
+        self.assertEqual(response.data['courses'][0]['title'], 'Geometry')
+
+    def test_query_params_and_logins_do_not_share_or_bust_entries(self):
+        url = reverse('students-list')
+        self.client.get(url)
+        self.admin.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url, {'page': 2})
+
+
+class CourseConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass', role='teacher')
+        self.course = Course.objects.create(title='Algebra', description='Basics', duration=10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_unchanged_courses_answer_304(self):
+        for url in (reverse('course-list'), reverse('course-detail', args=[self.course.id])):
+            etag = self.client.get(url)['ETag']
+            cache.clear()
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        url = reverse('course-detail', args=[self.course.id])
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_lists_are_validated_by_etag_only(self):
+        # Deleting an older course leaves the newest updated_at unchanged.
+        older = Course.objects.create(title='Geometry', description='', duration=10)
+        Course.objects.filter(pk=older.pk).update(updated_at=self.course.updated_at - timedelta(days=1))
+        response = self.client.get(reverse('course-list'))
+        self.assertNotIn('Last-Modified', response)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            older.delete()
+        response = self.client.get(reverse('course-list'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_related_changes_change_the_etag(self):
+        url = reverse('course-detail', args=[self.course.id])
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CourseTeacher.objects.create(course=self.course, teacher=self.teacher)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['teachers'], ['teacher'])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_enrollments_touch_their_courses_once_after_commit(self):
+        other = Course.objects.create(title='Geometry', description='', duration=10)
+        student = User.objects.create_user('student', 'student@example.com', 'pass', role='student')
+        Course.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        before = dict(Course.objects.values_list('id', 'updated_at'))
+
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                first = Enrollment.objects.create(student=student, course=self.course)
+                Enrollment.objects.create(student=student, course=other)
+                self.assertEqual(dict(Course.objects.values_list('id', 'updated_at')), before)
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('UPDATE "core_course" ')]), 1)
+        touched = dict(Course.objects.values_list('id', 'updated_at'))
+        self.assertTrue(all(touched[pk] > before[pk] for pk in before))
+
+        # Course responses do not show the status.
+        first.status = 'completed'
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        self.assertEqual(dict(Course.objects.values_list('id', 'updated_at')), touched)
+
+    def test_missing_course_is_404(self):
+        response = self.client.get(reverse('course-detail', args=[self.course.id + 1]), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(QUERY_STATS_ENABLED=True, QUERY_STATS_SERVER_TIMING=True)
+class QueryStatsTests(TestCase):
+    def setUp(self):
+        query_stats.reset()
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_records_queries_per_view(self):
+        for i in range(3):
+            Course.objects.create(title=f'Course {i}', description='Basics', duration=10)
+        response = self.client.get(reverse('course-list'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=[\d.]+$')
+
+        stats = self.client.get(reverse('admin-query-stats')).data['views']
+        courses = stats['course-list']
+        self.assertEqual(courses['requests'], 1)
+        self.assertEqual(set(courses['wall_ms']), {'p50', 'p95', 'p99'})
+        self.assertGreater(courses['queries']['p50'], 0)
+
+        self.client.delete(reverse('admin-query-stats'))
+        self.assertNotIn('course-list', self.client.get(reverse('admin-query-stats')).data['views'])
+
+    def test_repeated_queries_are_fingerprinted(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for i in range(3):
+                list(User.objects.filter(pk=i))
+        [(key, count)] = recorder.duplicates().items()
+        self.assertEqual(count, 3)
+        self.assertIn('core_user', recorder.samples[key])
@@ -2,13 +2,20 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from admin.views import (
     AdminCreateUserView,
+    BulkCreateUsersView,
+    BulkCreateUsersStatusView,
     UserListView,
     CourseViewSet,
     TeacherProfileViewSet,
     StudentProfileViewSet,
     CourseScheduleViewSet,
     EnrollStudentView,
-    AdminUnenrollStudentView  
+    BulkEnrollStudentsView,
+    AdminUnenrollStudentView,
+    QueryStatsView,
+    CourseListAsyncView,
+    ExportView,
+    EnrollmentStatsView,
 )
 
 router = DefaultRouter()
@@ -19,8 +26,15 @@ router.register(r'course-schedules', CourseScheduleViewSet, basename='course-sch
 
 urlpatterns = [
     path('create-user/', AdminCreateUserView.as_view(), name='admin-create-user'),
+    path('bulk-create-users/', BulkCreateUsersView.as_view(), name='admin-bulk-create-users'),
+    path('bulk-create-users/<str:job_id>/', BulkCreateUsersStatusView.as_view(), name='admin-bulk-create-users-status'),
     path('user-list/', UserListView.as_view(), name='admin-user-list'),
     path('enroll-student/', EnrollStudentView.as_view(), name='enroll-student'),
+    path('bulk-enroll-students/', BulkEnrollStudentsView.as_view(), name='bulk-enroll-students'),
     path('unenroll-student/', AdminUnenrollStudentView.as_view(), name='unenroll-student'),  # <- new path
+    path('query-stats/', QueryStatsView.as_view(), name='admin-query-stats'),
+    path('enrollment-stats/', EnrollmentStatsView.as_view(), name='admin-enrollment-stats'),
+    path('export/<str:dataset>/', ExportView.as_view(), name='admin-export'),
+    path('async/courses/', CourseListAsyncView.as_view(), name='course-list-async'),
     path('', include(router.urls))
 ]
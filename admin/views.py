@@ -9,11 +9,70 @@ from core.models import User , CourseSchedule
 from drf_yasg import openapi
 from rest_framework import viewsets
 from core.models import Course , CourseTeacher , User , Enrollment
-from admin.serializers import CourseSerializer , StudentListSerializer , StudentProfileSerializer
+from admin.serializers import CourseSerializer , CourseReadSerializer , StudentListSerializer , StudentProfileSerializer
 from django.shortcuts import get_object_or_404
 from admin.serializers import TeacherProfileSerializer , EnrollmentSerializer , AssignTeacherSerializer  , TeacherListSerializer
 from rest_framework.decorators import action
-from admin.task import send_user_credentials_email , send_enrollment_email , send_unenrollment_email , send_teacher_assignment_email
+from rest_framework.reverse import reverse
+from admin.task import send_user_credentials_email
+from core.outbox import emit
+from django.db import transaction
+from core.counters import get_role_counts
+from core.pagination import IdCursorPagination
+from core.middleware import query_stats
+from core.responsecache import VersionedResponseCacheMixin
+from core.asyncviews import AsyncReadView, json_response
+from core.conditional import ConditionalGetMixin, make_validators, updated_at_validators
+from functools import partial
+from django.conf import settings
+from admin.bulk import bulk_enroll, read_rows, start_user_import, get_user_import
+from admin.export import EXPORTS, FORMATS, async_chunks, stream_export
+from core.stats import enrollment_stats, parse_cohort_key
+from core.models import EnrollmentStat
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from collections import defaultdict
+
+
+def course_username_rows(course_ids):
+    """(attribute, [(course_id, username)] queryset) pairs for attach_course_usernames()."""
+    return [
+        ('teacher_usernames', CourseTeacher.objects.filter(
+            course_id__in=course_ids
+        ).order_by('course_id', 'id').values_list('course_id', 'teacher__username')),
+        ('student_usernames', Enrollment.objects.filter(
+            course_id__in=course_ids
+        ).order_by('course_id', 'id').values_list('course_id', 'student__username')),
+    ]
+
+
+def attach_course_usernames(courses):
+    """
+    Attach `teacher_usernames` and `student_usernames` lists to each course.
+
+    Usernames are loaded as flat value lists with one query per relation,
+    so the number of queries does not depend on how many courses,
+    teachers or students there are.
+    """
+    courses = list(courses)
+    for attr, rows in course_username_rows([course.id for course in courses]):
+        usernames = defaultdict(list)
+        for course_id, username in rows:
+            usernames[course_id].append(username)
+        for course in courses:
+            setattr(course, attr, usernames[course.id])
+    return courses
+
+
+async def aattach_course_usernames(courses):
+    """attach_course_usernames() with the async ORM; `courses` must be a list."""
+    for attr, rows in course_username_rows([course.id for course in courses]):
+        usernames = defaultdict(list)
+        async for course_id, username in rows:
+            usernames[course_id].append(username)
+        for course in courses:
+            setattr(course, attr, usernames[course.id])
+    return courses
 
 class AdminCreateUserView(APIView):
     permission_classes = [IsCustomAdmin]
@@ -43,9 +102,160 @@ class AdminCreateUserView(APIView):
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+class BulkCreateUsersView(APIView):
+    """
+    Import students/teachers from a JSON array or a CSV upload.
+    The import runs in the background; poll the returned status URL for progress.
+    """
+    permission_classes = [IsCustomAdmin]
+
+    @swagger_auto_schema(
+        request_body=openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'username': openapi.Schema(type=openapi.TYPE_STRING),
+                    'email': openapi.Schema(type=openapi.TYPE_STRING),
+                    'role': openapi.Schema(type=openapi.TYPE_STRING, enum=['student', 'teacher']),
+                    'first_name': openapi.Schema(type=openapi.TYPE_STRING),
+                    'last_name': openapi.Schema(type=openapi.TYPE_STRING),
+                },
+                required=['username', 'email']
+            )
+        ),
+        tags=['Bulk Create Users by Admin']
+    )
+    def post(self, request):
+        rows = read_rows(request)
+        job_id = start_user_import(rows)
+
+        return Response({
+            "message": "User import queued. Credentials emails are sent as users are created.",
+            "job_id": job_id,
+            "total": len(rows),
+            "status_url": reverse('admin-bulk-create-users-status', args=[job_id], request=request)
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class BulkCreateUsersStatusView(APIView):
+    permission_classes = [IsCustomAdmin]
+
+    @swagger_auto_schema(tags=['Bulk Create Users by Admin'])
+    def get(self, request, job_id):
+        job = get_user_import(job_id)
+        if job is None:
+            return Response({"detail": "Import job not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job)
+
+
+class QueryStatsView(APIView):
+    """
+    Per-view query counts, SQL time and latency percentiles recorded by
+    QueryStatsMiddleware in the process that serves the request.
+    DELETE clears them.
+    """
+    permission_classes = [IsCustomAdmin]
+
+    @swagger_auto_schema(tags=['Query Stats by Admin'])
+    def get(self, request):
+        return Response({"enabled": settings.QUERY_STATS_ENABLED, "views": query_stats.snapshot()})
+
+    @swagger_auto_schema(tags=['Query Stats by Admin'])
+    def delete(self, request):
+        query_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ExportView(APIView):
+    """
+    Stream every student, teacher, enrollment or schedule as CSV or NDJSON
+    (`?as=ndjson`), optionally gzipped (`?compress=gzip`). Rows are written
+    as they are read, so memory use does not grow with the export.
+    """
+    permission_classes = [IsCustomAdmin]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('as', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(FORMATS), required=False),
+            openapi.Parameter('compress', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['gzip'], required=False),
+        ],
+        tags=['Export by Admin']
+    )
+    def get(self, request, dataset):
+        if dataset not in EXPORTS:
+            return Response({"detail": f"Unknown export. Choose one of: {', '.join(EXPORTS)}."}, status=status.HTTP_404_NOT_FOUND)
+        file_format = request.query_params.get('as', 'csv')
+        compress = request.query_params.get('compress')
+        if file_format not in FORMATS or compress not in (None, '', 'gzip'):
+            return Response({"detail": "Use as=csv or as=ndjson, and compress=gzip or nothing."}, status=status.HTTP_400_BAD_REQUEST)
+
+        chunks, content_type, filename = stream_export(dataset, file_format, compress == 'gzip')
+        if isinstance(request._request, ASGIRequest):
+            # Django would otherwise collect a sync iterator into a list under ASGI.
+            chunks = async_chunks(chunks)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def perform_content_negotiation(self, request, force=False):
+        # The body is CSV/NDJSON whatever the client accepts; only errors use a renderer.
+        return super().perform_content_negotiation(request, force=True)
+
+
+class EnrollmentStatsView(APIView):
+    """
+    Enrollment counts by status per course, per cohort (batch and
+    enrollment year) and per department. Read from the EnrollmentStat
+    summary rows, which are updated as enrollments change.
+    """
+    permission_classes = [IsCustomAdmin]
+
+    dimension_param = openapi.Parameter(
+        'dimension',
+        openapi.IN_QUERY,
+        description="Only return one breakdown",
+        type=openapi.TYPE_STRING,
+        enum=[choice for choice, _ in EnrollmentStat.DIMENSION_CHOICES],
+        required=False
+    )
+
+    @swagger_auto_schema(manual_parameters=[dimension_param], tags=['Enrollment Stats by Admin'])
+    def get(self, request):
+        dimensions = [choice for choice, _ in EnrollmentStat.DIMENSION_CHOICES]
+        dimension = request.query_params.get('dimension')
+        if dimension:
+            if dimension not in dimensions:
+                return Response({"detail": f"Choose a dimension from: {', '.join(dimensions)}."}, status=status.HTTP_400_BAD_REQUEST)
+            dimensions = [dimension]
+        return Response({f'by_{name}': getattr(self, f'{name}_rows')() for name in dimensions})
+
+    def course_rows(self):
+        stats = {int(key): row for key, row in enrollment_stats('course').items()}
+        titles = dict(Course.objects.filter(pk__in=stats).values_list('id', 'title'))
+        return [
+            {"course_id": course_id, "title": titles.get(course_id), **stats[course_id]}
+            for course_id in sorted(stats)
+        ]
+
+    def cohort_rows(self):
+        rows = []
+        for key, counts in sorted(enrollment_stats('cohort').items()):
+            enrollment_year, batch = parse_cohort_key(key)
+            rows.append({"enrollment_year": enrollment_year, "batch": batch, **counts})
+        return rows
+
+    def department_rows(self):
+        return [
+            {"department": key or None, **counts}
+            for key, counts in sorted(enrollment_stats('department').items())
+        ]
+
+
 class UserListView(generics.ListAPIView):
     serializer_class = UserNameSerializer
     permission_classes = [IsCustomAdmin]
+    pagination_class = IdCursorPagination
 
     role_param = openapi.Parameter(
         'role',
@@ -61,34 +271,71 @@ class UserListView(generics.ListAPIView):
         tags=['List Users by Admin']
     )
     def get(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        
-        total_students = User.objects.filter(role='student').count()
-        total_teachers = User.objects.filter(role='teacher').count()
-        
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+
+        role_counts = get_role_counts()
+        role = self.get_role()
+
         return Response({
-            "total_students": total_students,
-            "total_teachers": total_teachers,
-            "count": queryset.count(),
+            "total_students": role_counts['student'],
+            "total_teachers": role_counts['teacher'],
+            "count": role_counts[role] if role else sum(role_counts.values()),
+            "next": self.paginator.get_next_link(),
+            "previous": self.paginator.get_previous_link(),
             "results": serializer.data
         })
 
-    def get_queryset(self):
+    def get_role(self):
         role = self.request.query_params.get('role')
-        queryset = User.objects.all()
         if role and role.lower() in ['student', 'teacher']:
-            queryset = queryset.filter(role=role.lower())
+            return role.lower()
+        return None
+
+    def get_queryset(self):
+        role = self.get_role()
+        queryset = User.objects.all()
+        if role:
+            queryset = queryset.filter(role=role)
         return queryset
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(ConditionalGetMixin, VersionedResponseCacheMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [IsCustomAdmin]
+    cache_groups = ('courses', 'course_teachers', 'enrollments', 'users')
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'retrieve'):
+            return CourseReadSerializer
+        return CourseSerializer
+
+    def get_validators(self, request, *args, **kwargs):
+        # A cached response carries the validators it was built with.
+        _, entry = self.get_cached_entry(request, **kwargs)
+        if entry is not None and entry['validators'] is not None:
+            return entry['validators']
+        # Teacher, enrollment and schedule changes touch Course.updated_at.
+        if self.action == 'retrieve':
+            self.course = self.get_object()
+            return make_validators(self.course.updated_at, 1)
+        return updated_at_validators(self.filter_queryset(self.get_queryset()))
 
     @swagger_auto_schema(tags=["Display Courses List by Admin"])
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        handler = partial(self.cached_response, self.list_courses)
+        return self.conditional_response(handler, request, *args, **kwargs)
+
+    def list_courses(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(attach_course_usernames(page), many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(attach_course_usernames(queryset), many=True)
+        return Response(serializer.data)
 
     @swagger_auto_schema(tags=["Add Course by Admin"])
     def create(self, request, *args, **kwargs):
@@ -96,7 +343,14 @@ class CourseViewSet(viewsets.ModelViewSet):
 
     @swagger_auto_schema(tags=["Course Details by Admin"])
     def retrieve(self, request, *args, **kwargs):
-        return super().retrieve(request, *args, **kwargs)
+        handler = partial(self.cached_response, self.retrieve_course)
+        return self.conditional_response(handler, request, *args, detail=True, **kwargs)
+
+    def retrieve_course(self, request, *args, **kwargs):
+        course = self.course
+        attach_course_usernames([course])
+        serializer = self.get_serializer(course)
+        return Response(serializer.data)
 
     @swagger_auto_schema(tags=["Update Course by Admin"])
     def update(self, request, *args, **kwargs):
@@ -126,13 +380,15 @@ class CourseViewSet(viewsets.ModelViewSet):
             teacher = User.objects.get(id=teacher_id)
 
             
-            course_teacher, created = CourseTeacher.objects.get_or_create(
-                course=course, teacher=teacher
-            )
+            with transaction.atomic():
+                course_teacher, created = CourseTeacher.objects.get_or_create(
+                    course=course, teacher=teacher
+                )
+                if created:
+                    emit('course.teacher_assigned', teacher_id=teacher_id, course_id=course.id)
 
             if created:
                 message = f"Teacher '{teacher.username}' assigned successfully!"
-                send_teacher_assignment_email.delay(teacher_id, course.id)
             else:
                 message = f"Teacher '{teacher.username}' is already assigned to this course."
 
@@ -140,9 +396,20 @@ class CourseViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class TeacherProfileViewSet(viewsets.ReadOnlyModelViewSet):
+class CourseListAsyncView(AsyncReadView):
+    """Course list with teacher and student usernames, for ASGI (same body as course-list)."""
+    roles = ('admin',)
+
+    async def get(self, request):
+        courses = [course async for course in Course.objects.order_by('id')]
+        await aattach_course_usernames(courses)
+        return json_response(CourseReadSerializer(courses, many=True).data)
+
+
+class TeacherProfileViewSet(VersionedResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.filter(role='teacher').prefetch_related('courses')
     permission_classes = [IsCustomAdmin]
+    cache_groups = ('users', 'courses', 'course_teachers')
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -158,6 +425,7 @@ class TeacherProfileViewSet(viewsets.ReadOnlyModelViewSet):
         return super().retrieve(request, *args, **kwargs)
 
 class StudentProfileViewSet(
+    VersionedResponseCacheMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
@@ -168,6 +436,7 @@ class StudentProfileViewSet(
     Admin can view, update, or delete student profiles
     """
     permission_classes = [IsCustomAdmin]
+    cache_groups = ('users',)
 
     def get_queryset(self):
         return User.objects.filter(role='student')
@@ -197,13 +466,14 @@ class StudentProfileViewSet(
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
 
-class CourseScheduleViewSet(viewsets.ModelViewSet):
+class CourseScheduleViewSet(VersionedResponseCacheMixin, viewsets.ModelViewSet):
     """
     Admin can create, update, view, and delete course schedules
     """
     queryset = CourseSchedule.objects.all()
     serializer_class = CourseScheduleSerializerAdmin
     permission_classes = [IsCustomAdmin]
+    cache_groups = ('schedules', 'courses', 'users')
 
     @swagger_auto_schema(tags=["Course Schedule List by Admin"])
     def list(self, request, *args, **kwargs):
@@ -237,9 +507,9 @@ class EnrollStudentView(APIView):
     def post(self, request):
         serializer = EnrollmentSerializer(data=request.data)
         if serializer.is_valid():
-            enrollment = serializer.save()
-
-            send_enrollment_email.delay(enrollment.student.id, enrollment.course.id)
+            with transaction.atomic():
+                enrollment = serializer.save()
+                emit('enrollment.created', student_id=enrollment.student_id, course_id=enrollment.course_id)
 
             return Response({
                 "message": "Student enrolled successfully! Emails are queued to be sent.",
@@ -248,6 +518,42 @@ class EnrollStudentView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)       
     
     
+class BulkEnrollStudentsView(APIView):
+    """
+    Enroll many students at once from a JSON array or a CSV upload
+    with student_id, course_id and (optional) status columns.
+    """
+    permission_classes = [IsCustomAdmin]
+
+    @swagger_auto_schema(
+        request_body=openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'student_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'course_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'status': openapi.Schema(type=openapi.TYPE_STRING, enum=['active', 'completed', 'dropped']),
+                },
+                required=['student_id', 'course_id']
+            )
+        ),
+        tags=["Admin Bulk Enrollment"]
+    )
+    def post(self, request):
+        results = bulk_enroll(read_rows(request))
+
+        summary = {'enrolled': 0, 'already_enrolled': 0, 'duplicate': 0, 'error': 0}
+        for result in results:
+            summary[result['status']] += 1
+
+        return Response({
+            "message": "Bulk enrollment processed. Emails are queued to be sent.",
+            "summary": summary,
+            "results": results
+        }, status=status.HTTP_200_OK)
+
+
 class AdminUnenrollStudentView(APIView):
     permission_classes = [IsCustomAdmin]
 
@@ -269,8 +575,9 @@ class AdminUnenrollStudentView(APIView):
             if not enrollment:
                 return Response({"detail": "Enrollment not found."}, status=status.HTTP_404_NOT_FOUND)
 
-            enrollment.delete()
-            send_unenrollment_email.delay(student_id, course_id)
+            with transaction.atomic():
+                enrollment.delete()
+                emit('enrollment.removed', student_id=student_id, course_id=course_id)
 
             return Response({"message": "Student unenrolled from course successfully."}, status=status.HTTP_200_OK)
 
@@ -0,0 +1,54 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json')
+
+
+async def authenticate(request):
+    """
+    Run the DRF authentication classes for a plain Django request.
+
+    They may query the database (for tokens without claims), so they run
+    on the shared sync thread, whose connection Django closes at the end
+    of the request; a thread from the default executor would keep its own
+    connection open after the request.
+    """
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = await sync_to_async(authentication_class().authenticate)(request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+class AsyncReadView(View):
+    """
+    Async GET endpoint for ASGI deployments.
+
+    Authenticates like the DRF views and allows users whose role is in
+    `roles`. Handlers read with the async ORM and return serializer data
+    through json_response(), so the response body matches the DRF view
+    it mirrors. While a handler waits on the database or on a slow client
+    it holds no worker thread.
+    """
+    http_method_names = ['get']
+    roles = ()
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            user = await authenticate(request)
+        except exceptions.APIException as exc:
+            return json_response({'detail': exc.detail}, exc.status_code)
+
+        if user is None:
+            return json_response({'detail': exceptions.NotAuthenticated.default_detail}, status.HTTP_401_UNAUTHORIZED)
+        if user.role not in self.roles:
+            return json_response({'detail': exceptions.PermissionDenied.default_detail}, status.HTTP_403_FORBIDDEN)
+
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,239 @@
+import time
+import tracemalloc
+from collections import namedtuple
+from types import SimpleNamespace
+
+from django.db import connection, transaction
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from admin.bulk import start_user_import
+from user.authentication import add_user_claims
+from .middleware import QueryRecorder, percentile
+from .models import User, CourseTeacher, CourseSchedule, Enrollment
+
+BENCHMARKED_URLCONFS = ('admin.urls', 'teacher.urls', 'students.urls', 'user.urls')
+
+Endpoint = namedtuple('Endpoint', ['url_name', 'method', 'role', 'kwargs', 'data'], defaults=[None, None])
+
+
+def _course(ctx):
+    return {'pk': ctx.course}
+
+
+def _student(ctx):
+    return {'pk': ctx.student}
+
+
+def _schedule(ctx):
+    return {'pk': ctx.schedule}
+
+
+# `kwargs` and `data` take the sample context built by sample_context().
+# GET data becomes the query string. Every request runs in a transaction
+# that is rolled back, so mutating endpoints see the same data each time.
+ENDPOINTS = [
+    Endpoint('admin-create-user', 'post', 'admin', data=lambda ctx: {
+        'username': 'bench_new_user', 'email': 'bench_new_user@example.com', 'role': 'student',
+    }),
+    Endpoint('admin-bulk-create-users', 'post', 'admin', data=lambda ctx: [
+        {'username': f'bench_import{i}', 'email': f'bench_import{i}@example.com', 'role': 'student'}
+        for i in range(50)
+    ]),
+    Endpoint('admin-bulk-create-users-status', 'get', 'admin', kwargs=lambda ctx: {'job_id': start_user_import([])}),
+    Endpoint('admin-user-list', 'get', 'admin', data=lambda ctx: {'role': 'student'}),
+    Endpoint('admin-query-stats', 'get', 'admin'),
+    Endpoint('course-list', 'get', 'admin'),
+    Endpoint('course-list-async', 'get', 'admin'),
+    Endpoint('course-list', 'post', 'admin', data=lambda ctx: {
+        'title': 'Bench course', 'description': 'Bench', 'duration': 10, 'teachers': [ctx.teacher_username],
+    }),
+    Endpoint('course-detail', 'get', 'admin', kwargs=_course),
+    Endpoint('course-detail', 'patch', 'admin', kwargs=_course, data=lambda ctx: {'title': 'Bench title'}),
+    Endpoint('course-detail', 'delete', 'admin', kwargs=_course),
+    Endpoint('course-assign-teacher', 'post', 'admin', kwargs=_course, data=lambda ctx: {'teacher_id': ctx.other_teacher}),
+    Endpoint('teachers-list', 'get', 'admin'),
+    Endpoint('teachers-detail', 'get', 'admin', kwargs=lambda ctx: {'pk': ctx.teacher}),
+    Endpoint('students-list', 'get', 'admin'),
+    Endpoint('students-detail', 'get', 'admin', kwargs=_student),
+    Endpoint('students-detail', 'patch', 'admin', kwargs=_student, data=lambda ctx: {'first_name': 'Bench'}),
+    Endpoint('students-detail', 'delete', 'admin', kwargs=_student),
+    Endpoint('course-schedule-list', 'get', 'admin'),
+    Endpoint('course-schedule-list', 'post', 'admin', data=lambda ctx: {
+        'course': ctx.course, 'teacher': ctx.teacher, 'day_of_week': 6,
+        'start_time': '06:00', 'end_time': '07:00', 'location': 'Bench room',
+    }),
+    Endpoint('course-schedule-detail', 'get', 'admin', kwargs=_schedule),
+    Endpoint('course-schedule-detail', 'patch', 'admin', kwargs=_schedule, data=lambda ctx: {'location': 'Bench hall'}),
+    Endpoint('course-schedule-detail', 'delete', 'admin', kwargs=_schedule),
+    Endpoint('admin-enrollment-stats', 'get', 'admin'),
+    Endpoint('admin-export', 'get', 'admin', kwargs=lambda ctx: {'dataset': 'enrollments'}),
+    Endpoint('enroll-student', 'post', 'admin', data=lambda ctx: {'student_id': ctx.other_student, 'course_id': ctx.course}),
+    Endpoint('bulk-enroll-students', 'post', 'admin', data=lambda ctx: [
+        {'student_id': student_id, 'course_id': ctx.course} for student_id in ctx.other_students
+    ]),
+    Endpoint('unenroll-student', 'post', 'admin', data=lambda ctx: {'student_id': ctx.student, 'course_id': ctx.course}),
+
+    Endpoint('teacher-profile', 'get', 'teacher'),
+    Endpoint('teacher-profile-async', 'get', 'teacher'),
+    Endpoint('teacher-profile', 'patch', 'teacher', data=lambda ctx: {'first_name': 'Bench'}),
+    Endpoint('teacher-assigned-courses', 'get', 'teacher'),
+    Endpoint('teacher-assigned-courses-async', 'get', 'teacher'),
+    Endpoint('teacher-assigned-course-detail', 'get', 'teacher', kwargs=lambda ctx: {'course_id': ctx.course}),
+    Endpoint('teacher-courses-with-students', 'get', 'teacher', data=lambda ctx: {'students_limit': 50}),
+    Endpoint('teacher-enroll-student', 'post', 'teacher', data=lambda ctx: {
+        'student_username': ctx.other_student_username, 'course_id': ctx.course,
+    }),
+    Endpoint('teacher-remove-student', 'delete', 'teacher', data=lambda ctx: {'student_id': ctx.student, 'course_id': ctx.course}),
+    Endpoint('teacher-timetable', 'get', 'teacher'),
+
+    Endpoint('student-profile', 'get', 'student'),
+    Endpoint('student-profile-async', 'get', 'student'),
+    Endpoint('student-profile', 'patch', 'student', data=lambda ctx: {'first_name': 'Bench'}),
+    Endpoint('student-enrolled-courses', 'get', 'student'),
+    Endpoint('student-enrolled-courses-async', 'get', 'student'),
+    Endpoint('student-timetable', 'get', 'student'),
+
+    Endpoint('login-user', 'post', None, data=lambda ctx: {'email': ctx.student_email, 'password': 'password'}),
+    Endpoint('notification-inbox', 'get', 'student'),
+    Endpoint('notification-mark-read', 'post', 'student', data=lambda ctx: {'all': True}),
+]
+
+
+def route_names(urlconfs=BENCHMARKED_URLCONFS):
+    """Every named route in `urlconfs`, to check ENDPOINTS covers them all."""
+    names = set()
+    pending = [pattern for urlconf in urlconfs for pattern in get_resolver(urlconf).url_patterns]
+    while pending:
+        pattern = pending.pop()
+        if isinstance(pattern, URLResolver):
+            pending.extend(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name and pattern.name != 'api-root':
+            names.add(pattern.name)
+    return names
+
+
+def sample_context():
+    """
+    Pick the rows the benchmark requests use: a course with a teacher,
+    schedules and students, plus students and a teacher outside it.
+    Creates an admin if there is none, so run inside a rolled-back transaction.
+    """
+    assignment = CourseTeacher.objects.filter(
+        course__enrollments__isnull=False, course__schedules__isnull=False
+    ).select_related('teacher').order_by('id').first()
+    if assignment is None:
+        raise ValueError("No course has a teacher, a schedule and students; run seed_data first.")
+
+    course = assignment.course_id
+    student = User.objects.get(
+        pk=Enrollment.objects.filter(course_id=course).order_by('id').values_list('student_id', flat=True)[0]
+    )
+    others = list(User.objects.filter(role='student').exclude(enrollments__course_id=course).order_by('id')[:50])
+    other_teacher = User.objects.filter(role='teacher').exclude(courses=course).order_by('id').first()
+    admin = User.objects.filter(role='admin').order_by('id').first()
+    if admin is None:
+        admin = User.objects.create_user('bench_admin', 'bench_admin@example.com', 'password', role='admin')
+
+    return SimpleNamespace(
+        users={'admin': admin, 'teacher': assignment.teacher, 'student': student},
+        course=course,
+        teacher=assignment.teacher_id,
+        teacher_username=assignment.teacher.username,
+        other_teacher=other_teacher.pk if other_teacher else assignment.teacher_id,
+        student=student.pk,
+        student_email=student.email,
+        other_student=others[0].pk if others else student.pk,
+        other_student_username=others[0].username if others else student.username,
+        other_students=[user.pk for user in others],
+        schedule=CourseSchedule.objects.filter(course_id=course).order_by('id').values_list('id', flat=True)[0],
+    )
+
+
+def make_clients(ctx):
+    clients = {None: APIClient()}
+    for role, user in ctx.users.items():
+        client = APIClient()
+        token = add_user_claims(RefreshToken.for_user(user), user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        clients[role] = client
+    return clients
+
+
+def _prepare(endpoint, ctx):
+    url = reverse(endpoint.url_name, kwargs=endpoint.kwargs(ctx) if endpoint.kwargs else None)
+    data = endpoint.data(ctx) if endpoint.data else None
+    return url, data
+
+
+def _send(client, endpoint, url, data):
+    if endpoint.method == 'get':
+        response = client.get(url, data)
+    else:
+        response = getattr(client, endpoint.method)(url, data, format='json')
+    if response.streaming:
+        # Streamed bodies run their queries as they are read.
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def measure(client, endpoint, ctx, iterations):
+    """Time `iterations` requests to one endpoint, each in a rolled-back transaction."""
+    wall, queries, statuses = [], [], set()
+    for _ in range(iterations):
+        with transaction.atomic():
+            url, data = _prepare(endpoint, ctx)
+            recorder = QueryRecorder()
+            start = time.perf_counter()
+            with connection.execute_wrapper(recorder):
+                response = _send(client, endpoint, url, data)
+            wall.append((time.perf_counter() - start) * 1000)
+            queries.append(recorder.count)
+            statuses.add(response.status_code)
+            transaction.set_rollback(True)
+
+    # Peak memory comes from one extra traced request; tracing slows everything down.
+    with transaction.atomic():
+        url, data = _prepare(endpoint, ctx)
+        tracemalloc.start()
+        try:
+            _send(client, endpoint, url, data)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        transaction.set_rollback(True)
+
+    return {
+        'p50_ms': round(percentile(wall, 50), 2),
+        'p95_ms': round(percentile(wall, 95), 2),
+        'p99_ms': round(percentile(wall, 99), 2),
+        'queries': max(queries),
+        'peak_kb': round(peak / 1024, 1),
+        'status': sorted(statuses),
+    }
+
+
+def endpoint_key(endpoint):
+    return f'{endpoint.method.upper()} {endpoint.url_name}'
+
+
+def compare(baseline, results, tolerance, min_delta_ms=2.0):
+    """
+    Return a line per endpoint that got slower than `tolerance` allows
+    (p95, relative to the baseline, ignoring changes under `min_delta_ms`)
+    or now runs more queries.
+    """
+    regressions = []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        slower = result['p95_ms'] - before['p95_ms']
+        if slower > min_delta_ms and result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {before['p95_ms']} -> {result['p95_ms']} ms")
+        if result['queries'] > before['queries']:
+            regressions.append(f"{key}: queries {before['queries']} -> {result['queries']}")
+    return regressions
+
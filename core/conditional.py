@@ -0,0 +1,124 @@
+import hashlib
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Course
+from .versioning import bump_versions, group_version_name
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+
+def make_validators(modified, count, *parts):
+    """(etag, last_modified) for rows whose newest `updated_at` is `modified`."""
+    return make_etag(modified, count, *parts), modified
+
+
+def updated_at_validators(queryset, *parts, allow_empty=True):
+    """
+    Return (etag, last_modified) for the rows in `queryset` from one
+    aggregate: the newest `updated_at` and the row count. The count catches
+    deletes, which leave no newer timestamp behind. `parts` go into the ETag
+    too, e.g. to tell users apart. With allow_empty=False an empty queryset
+    returns (None, None), so detail views skip the check and 404 as usual.
+    """
+    validators = queryset.order_by().aggregate(modified=Max('updated_at'), count=Count('pk'))
+    if not validators['count'] and not allow_empty:
+        return None, None
+    return make_validators(validators['modified'], validators['count'], *parts)
+
+
+def _touch(course_ids):
+    Course.objects.filter(pk__in=course_ids).update(updated_at=timezone.now())
+    # update() skips the signals; admin course responses show updated_at.
+    bump_versions([group_version_name('courses')])
+
+
+def touch_courses(course_ids):
+    """
+    Move `updated_at` forward on courses whose teachers, students or
+    schedules changed, so their conditional GET validators change too.
+
+    Inside a transaction the touch waits until it commits, and all the
+    courses touched in it are updated by one UPDATE with one group bump;
+    the rows are not locked while the rest of the transaction runs.
+    """
+    course_ids = {course_id for course_id in course_ids if course_id}
+    if not course_ids:
+        return
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _touch(course_ids)
+        return
+
+    pending = connection.__dict__.setdefault('pending_course_touches', set())
+    pending.update(course_ids)
+
+    def flush():
+        # As in bump_versions(): the first callback to run takes them all.
+        touched = set(pending)
+        pending.clear()
+        if touched:
+            _touch(touched)
+
+    transaction.on_commit(flush)
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET for list/retrieve views.
+
+    Views implement get_etag(), or get_validators() to also send
+    Last-Modified; when the request's If-None-Match already holds that
+    ETag (or, without If-None-Match, If-Modified-Since is not older than
+    Last-Modified) the view answers 304 without running the query or the
+    serializer. Last-Modified is only used for single objects: deleting a
+    row that is not the newest leaves a list's newest `updated_at` as it
+    was, so lists are validated by ETag alone. Returning None from get_etag() (the default) skips the check.
+    """
+
+    def get_etag(self, request, *args, **kwargs):
+        return None
+
+    def get_validators(self, request, *args, **kwargs):
+        return self.get_etag(request, *args, **kwargs), None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, detail=True, **kwargs)
+
+    def not_modified(self, request, etag, last_modified):
+        if 'HTTP_IF_NONE_MATCH' in request.META:
+            client_etags = parse_etags(request.META['HTTP_IF_NONE_MATCH'])
+            return etag in client_etags or '*' in client_etags
+
+        since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        # HTTP dates have whole-second precision.
+        return since is not None and last_modified is not None and int(last_modified.timestamp()) <= since
+
+    def conditional_response(self, handler, request, *args, detail=False, **kwargs):
+        # Kept on the view so a cached response can store them with its data.
+        self.validators = etag, last_modified = self.get_validators(request, *args, **kwargs)
+        if not detail:
+            last_modified = None
+        if etag is None:
+            return handler(request, *args, **kwargs)
+
+        if self.not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
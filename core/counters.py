@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import User
+
+ROLE_COUNT_KEY = 'user_role_count:{}'
+ROLE_COUNT_TIMEOUT = 60 * 60
+
+
+def _role_keys():
+    return {role: ROLE_COUNT_KEY.format(role) for role, _ in User.ROLE_CHOICES}
+
+
+def get_role_counts():
+    """
+    Return a dict of {role: number of users}.
+
+    Counts are served from the cache and kept current by the User signals
+    in core.signals; on a miss they are rebuilt with one grouped query.
+    """
+    keys = _role_keys()
+    cached = cache.get_many(keys.values())
+    if len(cached) == len(keys):
+        return {role: cached[key] for role, key in keys.items()}
+
+    counts = dict.fromkeys(keys, 0)
+    counts.update(
+        User.objects.order_by().values_list('role').annotate(total=Count('id'))
+    )
+    cache.set_many({keys[role]: counts[role] for role in keys}, ROLE_COUNT_TIMEOUT)
+    return counts
+
+
+def _incr_role_count(role, delta):
+    try:
+        cache.incr(ROLE_COUNT_KEY.format(role), delta)
+    except ValueError:
+        # Not cached yet, the next read rebuilds it from the database.
+        pass
+
+
+def adjust_role_count(role, delta):
+    """Add `delta` to the cached count of `role` once the current transaction commits."""
+    transaction.on_commit(lambda: _incr_role_count(role, delta))
+
+
+def reset_role_counts():
+    cache.delete_many(list(_role_keys().values()))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import CourseSchedule
+from core.scheduling import SLOT_FIELDS, Slot, describe_conflict, find_conflicts
+
+
+class Command(BaseCommand):
+    help = "Report every teacher or location double booking in the course timetable."
+
+    def handle(self, *args, **options):
+        slots = [Slot(*row) for row in CourseSchedule.objects.values_list(*SLOT_FIELDS).iterator()]
+        conflicts = find_conflicts(slots)
+
+        for conflict in conflicts:
+            self.stdout.write(f"Schedule {conflict.slot.id}: {describe_conflict(conflict)}")
+
+        if conflicts:
+            raise CommandError(f"{len(conflicts)} conflicts found in {len(slots)} schedules.")
+        self.stdout.write(self.style.SUCCESS(f"No conflicts in {len(slots)} schedules."))
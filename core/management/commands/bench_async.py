@@ -0,0 +1,131 @@
+import asyncio
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.benchmarks import sample_context
+from core.middleware import percentile
+from user.authentication import add_user_claims
+
+# (sync route, async route, role)
+PAIRS = [
+    ('student-enrolled-courses', 'student-enrolled-courses-async', 'student'),
+    ('student-profile', 'student-profile-async', 'student'),
+    ('teacher-assigned-courses', 'teacher-assigned-courses-async', 'teacher'),
+    ('teacher-profile', 'teacher-profile-async', 'teacher'),
+    ('course-list', 'course-list-async', 'admin'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync read endpoints behind a WSGI thread pool with their async versions under "
+        "ASGI, with many concurrent clients that read responses slowly. Each client holds its "
+        "connection for --client-delay seconds after the response starts, which on WSGI keeps a "
+        "worker thread busy. Needs a committed, seeded database (see seed_data); creates an admin "
+        "if there is none."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help="Requests per endpoint and server.")
+        parser.add_argument('--concurrency', type=int, default=100, help="Clients in flight at once.")
+        parser.add_argument('--threads', type=int, default=8, help="WSGI worker threads.")
+        parser.add_argument('--client-delay', type=float, default=0.05, help="Seconds each client takes to read a response.")
+        parser.add_argument('--only', nargs='*', help="Only run these sync route names.")
+
+    def handle(self, *args, **options):
+        try:
+            ctx = sample_context()
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        tokens = {
+            role: f'Bearer {add_user_claims(RefreshToken.for_user(user), user).access_token}'
+            for role, user in ctx.users.items()
+        }
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+
+        wsgi = get_wsgi_application()
+        asgi = get_asgi_application()
+        for sync_name, async_name, role in PAIRS:
+            if options['only'] and sync_name not in options['only']:
+                continue
+            before = self.run_wsgi(wsgi, reverse(sync_name), tokens[role], host, options)
+            after = asyncio.run(self.run_asgi(asgi, reverse(async_name), tokens[role], host, options))
+            self.write_row(f'{sync_name} (WSGI x{options["threads"]})', before)
+            self.write_row(f'{async_name} (ASGI)', after)
+
+    def write_row(self, label, result):
+        wall, latencies, statuses = result
+        self.stdout.write(
+            f"{label:<50} {len(latencies) / wall:8.1f} req/s  p50 {percentile(latencies, 50) * 1000:8.1f}"
+            f"  p95 {percentile(latencies, 95) * 1000:8.1f} ms  {sorted(statuses)}"
+        )
+
+    def run_wsgi(self, app, path, token, host, options):
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SERVER_NAME': host,
+            'SERVER_PORT': '80', 'HTTP_HOST': host, 'HTTP_AUTHORIZATION': token, 'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(), 'wsgi.errors': io.StringIO(), 'SERVER_PROTOCOL': 'HTTP/1.1',
+        }
+        statuses = set()
+        workers = threading.Semaphore(options['threads'])
+
+        def call(_):
+            # Latency counts the wait for a free worker, like a client queued on the server.
+            start = time.perf_counter()
+            with workers:
+                response = app(dict(environ, **{'wsgi.input': io.BytesIO()}), lambda status, headers: statuses.add(int(status[:3])))
+                for _ in response:
+                    # A slow client keeps the worker thread writing.
+                    time.sleep(options['client_delay'])
+                response.close()
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as clients:
+            latencies = list(clients.map(call, range(options['requests'])))
+        return time.perf_counter() - start, latencies, statuses
+
+    async def run_asgi(self, app, path, token, host, options):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', host.encode()), (b'authorization', token.encode())],
+            'client': ('127.0.0.1', 0), 'server': (host, 80),
+        }
+        statuses = set()
+        slots = asyncio.Semaphore(options['concurrency'])
+
+        async def call():
+            async with slots:
+                start = time.perf_counter()
+                done = asyncio.Event()
+                messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+                async def receive():
+                    if messages:
+                        return messages.pop()
+                    await done.wait()
+                    return {'type': 'http.disconnect'}
+
+                async def send(message):
+                    if message['type'] == 'http.response.start':
+                        statuses.add(message['status'])
+                    elif not message.get('more_body'):
+                        await asyncio.sleep(options['client_delay'])
+                        done.set()
+
+                await app(dict(scope), receive, send)
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(call() for _ in range(options['requests'])))
+        return time.perf_counter() - start, latencies, statuses
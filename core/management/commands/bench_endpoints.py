@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from Student_Management_System.celery import app as celery_app
+from core.benchmarks import ENDPOINTS, compare, endpoint_key, make_clients, measure, route_names, sample_context
+
+# Requests, signals and the cleanup between endpoints only ever touch this
+# private cache, never the shared one (sessions, counters, versions, timetables).
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench_endpoints',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Call every admin, teacher, student and user route through the test client and report "
+        "p50/p95/p99 latency, queries per request and peak memory. Compares against (or writes) "
+        "a JSON baseline. Run it against a seeded, non-production database: each request is "
+        "rolled back, and the run uses its own in-process cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per endpoint.")
+        parser.add_argument('--baseline', default='bench-baseline.json', help="Baseline file to compare against.")
+        parser.add_argument('--update-baseline', action='store_true', help="Overwrite the baseline with this run.")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed p95 slowdown, as a fraction.")
+        parser.add_argument('--min-delta-ms', type=float, default=2.0, help="Ignore p95 changes smaller than this.")
+        parser.add_argument('--only', nargs='*', help="Only run these route names.")
+
+    def handle(self, *args, **options):
+        missing = route_names() - {endpoint.url_name for endpoint in ENDPOINTS}
+        if missing:
+            self.stdout.write(self.style.WARNING(f"Routes without a benchmark: {', '.join(sorted(missing))}"))
+
+        endpoints = [e for e in ENDPOINTS if not options['only'] or e.url_name in options['only']]
+        results = {}
+
+        # Tasks run inline (no broker needed) and mail goes to the in-memory outbox.
+        try:
+            setup_test_environment()
+            test_environment = True
+        except RuntimeError:
+            # Already set up, e.g. when called from a test.
+            test_environment = False
+        always_eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        # Expected 4xx responses would otherwise log a warning per request.
+        request_logger = logging.getLogger('django.request')
+        log_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            with override_settings(CACHES=BENCH_CACHES), transaction.atomic():
+                try:
+                    ctx = sample_context()
+                except ValueError as exc:
+                    raise CommandError(str(exc))
+                clients = make_clients(ctx)
+
+                for endpoint in endpoints:
+                    key = endpoint_key(endpoint)
+                    results[key] = measure(clients[endpoint.role], endpoint, ctx, options['iterations'])
+                    self.write_row(key, results[key])
+                    # Signals also write to the cache (deleted-user markers, counters),
+                    # which the rollback does not undo.
+                    cache.clear()
+                transaction.set_rollback(True)
+        finally:
+            celery_app.conf.task_always_eager = always_eager
+            request_logger.setLevel(log_level)
+            if test_environment:
+                teardown_test_environment()
+
+        self.save_or_compare(results, options)
+
+    def write_row(self, key, result):
+        line = (
+            f"{key:<45} p50 {result['p50_ms']:>8.1f}  p95 {result['p95_ms']:>8.1f}  p99 {result['p99_ms']:>8.1f} ms"
+            f"  {result['queries']:>4} queries  {result['peak_kb']:>9.1f} KiB  {result['status']}"
+        )
+        if any(code >= 400 for code in result['status']):
+            line = self.style.WARNING(line)
+        self.stdout.write(line)
+
+    def save_or_compare(self, results, options):
+        path = options['baseline']
+        if options['update_baseline'] or not os.path.exists(path):
+            with open(path, 'w') as f:
+                json.dump({
+                    'created_at': datetime.now(timezone.utc).isoformat(),
+                    'database': connection.vendor,
+                    'iterations': options['iterations'],
+                    'endpoints': results,
+                }, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {path}."))
+            return
+
+        with open(path) as f:
+            baseline = json.load(f)['endpoints']
+        regressions = compare(baseline, results, options['tolerance'], options['min_delta_ms'])
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            raise CommandError(f"{len(regressions)} regressions against {path}.")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {path}."))
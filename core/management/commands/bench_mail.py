@@ -0,0 +1,101 @@
+import socketserver
+import threading
+import time
+
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from admin import mail
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept and discard messages."""
+
+    def reply(self, line):
+        self.wfile.write(line + b'\r\n')
+
+    def handle(self):
+        time.sleep(self.server.connect_delay)
+        self.reply(b'220 localhost SMTP sink')
+        in_data = False
+        for line in self.rfile:
+            if in_data:
+                if line.rstrip(b'\r\n') == b'.':
+                    in_data = False
+                    self.server.received += 1
+                    self.reply(b'250 OK')
+                continue
+
+            verb = line[:4].upper()
+            if verb in (b'EHLO', b'HELO'):
+                self.reply(b'250 localhost')
+            elif verb == b'DATA':
+                in_data = True
+                self.reply(b'354 End data with <CR><LF>.<CR><LF>')
+            elif verb == b'QUIT':
+                self.reply(b'221 Bye')
+                break
+            else:
+                self.reply(b'250 OK')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, connect_delay):
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.connect_delay = connect_delay
+        self.received = 0
+
+
+class Command(BaseCommand):
+    help = "Compare per-message send_mail against batched sends over a shared connection, using a local SMTP sink."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000, help="Messages to send in each mode.")
+        parser.add_argument('--batch', type=int, default=31, help="Messages per task (one student plus 30 teachers).")
+        parser.add_argument(
+            '--connect-delay', type=float, default=0.0,
+            help="Seconds the sink waits before greeting, to mimic a remote or TLS handshake."
+        )
+
+    def handle(self, *args, **options):
+        sink = SMTPSink(options['connect_delay'])
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+
+        email_settings = {
+            'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+            'EMAIL_HOST': '127.0.0.1',
+            'EMAIL_PORT': sink.server_address[1],
+            'EMAIL_USE_TLS': False,
+            'EMAIL_HOST_USER': '',
+            'EMAIL_HOST_PASSWORD': '',
+        }
+        total = options['messages']
+        batch = options['batch']
+
+        try:
+            with override_settings(**email_settings):
+                start = time.perf_counter()
+                for i in range(total):
+                    send_mail(f"Message {i}", "Benchmark body", 'noreply@example.com', [f'user{i}@example.com'])
+                before = time.perf_counter() - start
+
+                mail.close_mail_connection()
+                start = time.perf_counter()
+                for offset in range(0, total, batch):
+                    mail.send_messages([
+                        mail.build_message(f"Message {i}", "Benchmark body", f'user{i}@example.com')
+                        for i in range(offset, min(offset + batch, total))
+                    ])
+                after = time.perf_counter() - start
+                mail.close_mail_connection()
+        finally:
+            sink.shutdown()
+            sink.server_close()
+
+        self.stdout.write(f"send_mail per message:  {total / before:10.1f} messages/sec")
+        self.stdout.write(f"shared connection:      {total / after:10.1f} messages/sec")
+        self.stdout.write(f"speedup:                {before / after:10.2f}x ({sink.received} messages received)")
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.outbox import HANDLERS, deliver, emit, relay
+
+BENCH_TOPIC = 'bench.noop'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure outbox throughput: events emitted per second (one savepoint each) and events "
+        "relayed and delivered per second, with a handler that does nothing. Runs in a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=10_000)
+        parser.add_argument('--batch-size', type=int, nargs='*', default=[50, 200, 1000])
+
+    def handle(self, *args, **options):
+        total = options['events']
+        HANDLERS[BENCH_TOPIC] = lambda **payload: None
+        try:
+            for batch_size in options['batch_size']:
+                with transaction.atomic():
+                    start = time.perf_counter()
+                    event_ids = []
+                    for i in range(total):
+                        with transaction.atomic():
+                            event_ids.append(emit(BENCH_TOPIC, n=i).pk)
+                    emitted = time.perf_counter() - start
+
+                    # The relay sends on commit and this transaction is rolled
+                    # back, so the claimed events are delivered inline.
+                    start = time.perf_counter()
+                    relayed = relay(lambda claimed: None, batch_size)
+                    deliver(event_ids)
+                    drained = time.perf_counter() - start
+                    transaction.set_rollback(True)
+
+                self.stdout.write(
+                    f"batch {batch_size:>5}:  emit {total / emitted:10.1f} events/sec  "
+                    f"relay+deliver {relayed / drained:10.1f} events/sec"
+                )
+        finally:
+            del HANDLERS[BENCH_TOPIC]
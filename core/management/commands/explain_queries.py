@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.queryplans import explain, hot_queries, sequential_scans
+from core.seed import seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the main query of each endpoint against a seeded dataset and fail if any "
+        "of them needs a sequential scan. The seed is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--teachers', type=int, default=100)
+        parser.add_argument('--courses', type=int, default=200)
+        parser.add_argument('--no-seed', action='store_true', help="Explain against the data already in the database.")
+        parser.add_argument('--verbose-plans', action='store_true', help="Print every plan, not just the failing ones.")
+
+    def handle(self, *args, **options):
+        failures = []
+        with transaction.atomic():
+            if not options['no_seed']:
+                seed_dataset(students=options['students'], teachers=options['teachers'], courses=options['courses'])
+            if connection.vendor == 'postgresql':
+                # Small tables are cheaper to scan, which would hide a missing index;
+                # with seqscan "off" the planner only scans when no index applies.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                    cursor.execute('ANALYZE')
+
+            try:
+                queries = hot_queries()
+            except ValueError as exc:
+                raise CommandError(str(exc))
+
+            for name, queryset in queries:
+                plan = explain(queryset)
+                scans = sequential_scans(plan)
+                if scans:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f"{name}: sequential scan on {', '.join(scans)}"))
+                else:
+                    self.stdout.write(f"{name}: ok")
+                if scans or options['verbose_plans']:
+                    self.stdout.write(plan)
+
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"{len(failures)} of {len(queries)} queries fall back to a sequential scan.")
+        self.stdout.write(self.style.SUCCESS(f"All {len(queries)} queries use indexes."))
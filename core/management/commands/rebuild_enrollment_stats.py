@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.stats import rebuild_enrollment_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the enrollment stats behind /api/admin/enrollment-stats/ from the Enrollment table. "
+        "Signals keep them current; run this after raw SQL or bulk writes that skip them. Enrollments "
+        "written while it runs may be miscounted, so run it when writes are quiet."
+    )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rows = rebuild_enrollment_stats()
+        self.stdout.write(f"Rebuilt {rows} enrollment stat rows in {time.perf_counter() - start:.1f}s.")
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from admin.task import deliver_outbox_events
+from core.outbox import relay
+
+
+class Command(BaseCommand):
+    help = (
+        "Send pending outbox events to the Celery workers, a batch per task. Runs until stopped, "
+        "polling every OUTBOX_RELAY_INTERVAL seconds; several relays can run side by side."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain what is pending and exit.")
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=settings.OUTBOX_RELAY_INTERVAL)
+
+    def handle(self, *args, **options):
+        while True:
+            sent = relay(deliver_outbox_events.delay, options['batch_size'])
+            if sent:
+                self.stdout.write(f"Relayed {sent} events.")
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,133 @@
+import hashlib
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+PERCENTILES = (50, 95, 99)
+
+
+def fingerprint(sql):
+    """Queries that differ only in their parameters share a fingerprint."""
+    return hashlib.md5(' '.join(sql.split()).encode()).hexdigest()[:12]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class QueryRecorder:
+    """execute_wrapper that times every query run while it is installed."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.samples = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            key = fingerprint(sql)
+            self.fingerprints[key] += 1
+            self.samples.setdefault(key, sql[:300])
+
+    def duplicates(self):
+        return {key: count for key, count in self.fingerprints.items() if count > 1}
+
+
+class QueryStats:
+    """
+    Rolling per-view request samples, kept in this process's memory.
+
+    Each view keeps its last QUERY_STATS_WINDOW requests, so percentiles
+    follow recent traffic and memory stays bounded.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = defaultdict(lambda: deque(maxlen=settings.QUERY_STATS_WINDOW))
+            self.duplicates = defaultdict(Counter)
+            self.duplicate_sql = {}
+            self.requests = Counter()
+
+    def record(self, view_name, recorder, wall):
+        with self.lock:
+            self.requests[view_name] += 1
+            self.samples[view_name].append((wall * 1000, recorder.duration * 1000, recorder.count))
+            for key, count in recorder.duplicates().items():
+                self.duplicates[view_name][key] = max(self.duplicates[view_name][key], count)
+                self.duplicate_sql[key] = recorder.samples[key]
+
+    def snapshot(self):
+        with self.lock:
+            samples = {name: list(values) for name, values in self.samples.items()}
+            duplicates = {name: counter.most_common(5) for name, counter in self.duplicates.items()}
+            requests = dict(self.requests)
+            duplicate_sql = dict(self.duplicate_sql)
+
+        views = {}
+        for name, values in sorted(samples.items()):
+            wall, sql, queries = zip(*values)
+            views[name] = {
+                'requests': requests[name],
+                'window': len(values),
+                'wall_ms': {f'p{p}': round(percentile(wall, p), 2) for p in PERCENTILES},
+                'sql_ms': {f'p{p}': round(percentile(sql, p), 2) for p in PERCENTILES},
+                'queries': {f'p{p}': percentile(queries, p) for p in PERCENTILES},
+                'max_queries': max(queries),
+                'duplicate_queries': [
+                    {'fingerprint': key, 'max_per_request': count, 'sql': duplicate_sql[key]}
+                    for key, count in duplicates.get(name, [])
+                ],
+            }
+        return views
+
+
+query_stats = QueryStats()
+
+
+class QueryStatsMiddleware:
+    """
+    Record query count, SQL time, repeated queries and wall time per view.
+
+    Enabled with QUERY_STATS_ENABLED. Results are read from the admin
+    `query-stats/` endpoint; with QUERY_STATS_SERVER_TIMING each response
+    also gets a Server-Timing header.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_STATS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        wall = time.perf_counter() - start
+
+        match = request.resolver_match
+        if match is not None:
+            query_stats.record(match.view_name, recorder, wall)
+
+        if settings.QUERY_STATS_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries", '
+                f'total;dur={wall * 1000:.1f}'
+            )
+        return response
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_unread_notifications(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    Notification = apps.get_model('core', 'Notification')
+    unread = Notification.objects.filter(user=OuterRef('pk'), is_read=False).values('user').annotate(
+        count=Count('id')
+    ).values('count')
+    User.objects.update(unread_notifications=Coalesce(Subquery(unread), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_alter_courseschedule_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_unread_notifications, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='notification_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', '-created_at', '-id'], name='notification_unread_idx'),
+        ),
+    ]
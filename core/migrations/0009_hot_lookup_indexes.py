@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:11
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0008_notification_inbox_indexes_user_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='courseschedule',
+            index=models.Index(fields=['teacher', 'day_of_week', 'start_time'], name='schedule_teacher_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='courseschedule',
+            index=models.Index(django.db.models.functions.text.Upper('location'), models.F('day_of_week'), name='schedule_location_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['course', 'status'], name='enrollment_course_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'id'], name='user_role_id_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_teacherdigestentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('course', 'Course'), ('cohort', 'Cohort'), ('department', 'Department')], max_length=20)),
+                ('key', models.CharField(max_length=200)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('completed', 'Completed'), ('dropped', 'Dropped')], max_length=10)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'key', 'status'), name='enrollment_stat_key')],
+            },
+        ),
+    ]
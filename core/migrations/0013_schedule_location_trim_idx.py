@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:53
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_enrollmentstat'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='courseschedule',
+            name='schedule_location_day_idx',
+        ),
+        migrations.AddIndex(
+            model_name='courseschedule',
+            index=models.Index(django.db.models.functions.text.Upper(django.db.models.functions.text.Trim('location')), models.F('day_of_week'), name='schedule_location_day_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Exclusion constraints back the overlap check in CourseScheduleSerializerAdmin,
+# which two concurrent writes could both pass. Times become ranges on a fixed
+# date, half open like the check itself, so back-to-back classes still fit.
+# They need PostgreSQL and its btree_gist extension; other databases (the test
+# database) only get the check.
+SLOT_RANGE = "tsrange(DATE '2000-01-01' + start_time, DATE '2000-01-01' + end_time)"
+
+CONSTRAINTS = {
+    'schedule_teacher_no_overlap': f"teacher_id WITH =, day_of_week WITH =, ({SLOT_RANGE}) WITH &&",
+    'schedule_location_no_overlap': f"(upper(trim(location))) WITH =, day_of_week WITH =, ({SLOT_RANGE}) WITH &&",
+}
+
+
+def add_constraints(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    for name, expressions in CONSTRAINTS.items():
+        schema_editor.execute(f"ALTER TABLE core_courseschedule ADD CONSTRAINT {name} EXCLUDE USING gist ({expressions})")
+
+
+def remove_constraints(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in CONSTRAINTS:
+        schema_editor.execute(f"ALTER TABLE core_courseschedule DROP CONSTRAINT IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_schedule_location_trim_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_constraints, remove_constraints),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
+from django.db.models.functions import Trim, Upper
 from django.utils import timezone
 from django.conf import settings
 
@@ -46,14 +47,33 @@ class User(AbstractBaseUser, PermissionsMixin):
     batch = models.CharField(max_length=50, null=True, blank=True)
     roll_number = models.CharField(max_length=50, null=True, blank=True) 
 
+    # Kept in step with the user's unread notifications (see core.notifications).
+    unread_notifications = models.PositiveIntegerField(default=0)
+
     objects = UserManager()
 
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ['email']
 
+    class Meta:
+        indexes = [
+            # Admin user list: WHERE role = ... ORDER BY id, and the per-role counts.
+            models.Index(fields=['role', 'id'], name='user_role_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.role})"
 
+    def save(self, *args, **kwargs):
+        # The unread counter only moves through F() updates; a full-row save
+        # would write back the value read when this instance was loaded.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'unread_notifications'
+            ]
+        super().save(*args, **kwargs)
+
 class Course(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -114,6 +134,10 @@ class Enrollment(models.Model):
 
     class Meta:
         unique_together = ('student', 'course') 
+        indexes = [
+            # Active students of a course (timetables, rosters).
+            models.Index(fields=['course', 'status'], name='enrollment_course_status_idx'),
+        ]
 
     def __str__(self):
             return f"{self.student.username} -> {self.course.title} ({self.status})"
@@ -148,6 +172,12 @@ class CourseSchedule(models.Model):
 
     class Meta:
         unique_together = ('course', 'teacher', 'day_of_week', 'start_time', 'end_time')
+        indexes = [
+            # Teacher timetables and the teacher side of the conflict check.
+            models.Index(fields=['teacher', 'day_of_week', 'start_time'], name='schedule_teacher_day_idx'),
+            # Location side of the conflict check, which matches rooms ignoring case and padding.
+            models.Index(Upper(Trim('location')), 'day_of_week', name='schedule_location_day_idx'),
+        ]
 
     def __str__(self):
         return f"{self.course.title} ({self.teacher.username}) on {self.get_day_of_week_display()} from {self.start_time} to {self.end_time} at {self.location}"
@@ -169,3 +199,81 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     related_course = models.ForeignKey(Course, on_delete=models.CASCADE, null=True, blank=True)
     related_enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Inbox pages are read newest first, keyed on (created_at, id).
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_inbox_idx'),
+            models.Index(
+                fields=['user', '-created_at', '-id'],
+                condition=models.Q(is_read=False),
+                name='notification_unread_idx'
+            ),
+        ]
+
+
+class OutboxEvent(models.Model):
+    """
+    A side effect (email, notification) recorded in the same transaction as
+    the write that caused it. core.outbox relays pending events to Celery.
+    """
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # The relay only ever reads events that are not processed yet.
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True), name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk}"
+
+
+class TeacherDigestEntry(models.Model):
+    """
+    An enrollment change waiting to be reported to one of the course's
+    teachers. Entries for the same teacher and course are sent as a single
+    digest once the oldest is TEACHER_DIGEST_WINDOW seconds old.
+    """
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    enrolled = models.BooleanField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['teacher', 'course', 'created_at'], name='digest_group_idx'),
+        ]
+
+
+class EnrollmentStat(models.Model):
+    """
+    Enrollments counted by status per course, per student cohort (batch and
+    enrollment year) and per student department. Kept current by
+    core.stats as enrollments change; rebuild_enrollment_stats repairs it.
+    """
+    DIMENSION_CHOICES = (
+        ('course', 'Course'),
+        ('cohort', 'Cohort'),
+        ('department', 'Department'),
+    )
+
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=200)
+    status = models.CharField(max_length=10, choices=Enrollment.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key', 'status'], name='enrollment_stat_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension} {self.key} {self.status}: {self.count}"
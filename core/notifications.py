@@ -0,0 +1,76 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import Notification, User
+
+
+def build_notification(user, title, message, notif_type='general', related_course=None, email_sent=True):
+    return Notification(
+        user=user,
+        title=title,
+        message=message,
+        notif_type=notif_type,
+        related_course=related_course,
+        email_sent=email_sent
+    )
+
+
+def adjust_unread_counts(counts):
+    """
+    Add `counts` ({user_id: delta}) to the users' unread counters.
+    Users with the same delta share one UPDATE, so a fan-out of one
+    notification per user costs a single query.
+    """
+    by_delta = defaultdict(list)
+    for user_id, delta in counts.items():
+        if delta:
+            by_delta[delta].append(user_id)
+    for delta, user_ids in by_delta.items():
+        User.objects.filter(pk__in=user_ids).update(
+            unread_notifications=Greatest(F('unread_notifications') + delta, 0)
+        )
+
+
+def fan_out(notifications):
+    """
+    Save all `notifications` for an event with a single INSERT and bump
+    the recipients' unread counters. Use build_notification() to create
+    the unsaved rows.
+    """
+    with transaction.atomic():
+        created = Notification.objects.bulk_create(notifications)
+        adjust_unread_counts(Counter(n.user_id for n in created if not n.is_read))
+    return created
+
+
+def mark_read(user, ids=None):
+    """
+    Mark the user's unread notifications in `ids` (or all of them) as read.
+    Returns how many changed; the unread counter drops by the same amount,
+    so notifications that arrive meanwhile still count as unread.
+    """
+    unread = Notification.objects.filter(user=user, is_read=False)
+    if ids is not None:
+        unread = unread.filter(id__in=ids)
+    with transaction.atomic():
+        changed = unread.update(is_read=True)
+        adjust_unread_counts({user.pk: -changed})
+    return changed
+
+
+def forget_unread(notifications):
+    """
+    Take the unread rows of `notifications`, which are about to be deleted,
+    off their users' counters. They are marked read as well, so a row that
+    the same delete reaches through another cascade is not counted twice.
+    """
+    with transaction.atomic():
+        unread = dict(
+            notifications.filter(is_read=False).select_for_update().values_list('id', 'user_id')
+        )
+        if unread:
+            Notification.objects.filter(pk__in=unread).update(is_read=True)
+            adjust_unread_counts({user_id: -count for user_id, count in Counter(unread.values()).items()})
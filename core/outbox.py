@@ -0,0 +1,111 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# topic -> callable(**payload); registered by the modules that own the side effect.
+HANDLERS = {}
+
+
+def handles(topic):
+    def register(func):
+        HANDLERS[topic] = func
+        return func
+    return register
+
+
+def emit(topic, **payload):
+    """
+    Record an event. Call it inside the transaction of the write it
+    describes, so the event exists exactly when that write commits.
+    `payload` must be JSON serializable.
+    """
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def emit_many(topic, payloads):
+    return OutboxEvent.objects.bulk_create([OutboxEvent(topic=topic, payload=payload) for payload in payloads])
+
+
+def claim_batch(send, batch_size=None):
+    """
+    Hand up to `batch_size` pending events to `send(event_ids)` and return
+    how many were claimed.
+
+    Pending means not processed, never dispatched or dispatched more than
+    OUTBOX_REDELIVERY_TIMEOUT ago (the worker died or the handler failed),
+    and under OUTBOX_MAX_ATTEMPTS. Rows are locked with SKIP LOCKED, so
+    several relays can drain the table side by side. `send` runs once the
+    claim commits, so a slow broker never holds the locks; if it fails,
+    the events are sent again after the redelivery timeout.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        event_ids = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True).filter(
+                Q(dispatched_at__isnull=True) | Q(dispatched_at__lt=now - timedelta(seconds=settings.OUTBOX_REDELIVERY_TIMEOUT)),
+                processed_at__isnull=True,
+                attempts__lt=settings.OUTBOX_MAX_ATTEMPTS,
+            ).order_by('id').values_list('id', flat=True)[:batch_size or settings.OUTBOX_BATCH_SIZE]
+        )
+        if event_ids:
+            OutboxEvent.objects.filter(pk__in=event_ids).update(dispatched_at=now, attempts=F('attempts') + 1)
+            transaction.on_commit(lambda: send(event_ids))
+    return len(event_ids)
+
+
+def relay(send, batch_size=None, max_batches=None):
+    """Claim batches until nothing is pending (or `max_batches`); return the number of events sent."""
+    sent = batches = 0
+    while max_batches is None or batches < max_batches:
+        claimed = claim_batch(send, batch_size)
+        if not claimed:
+            break
+        sent += claimed
+        batches += 1
+    return sent
+
+
+def deliver(event_ids):
+    """
+    Run the handler of each event that is not processed yet and return how
+    many ran.
+
+    Delivery is at least once: an event that was already processed (a
+    redelivery, or a duplicate task) is skipped under its row lock, and
+    the handler's database writes commit together with `processed_at`.
+    A failing handler leaves its event pending for redelivery, and the
+    last allowed attempt logs that the event was given up on. Side effects
+    outside the database, such as email, are not rolled back: a handler
+    that sent mail and then failed, or a worker that died before the
+    commit, sends that mail again on redelivery.
+    """
+    processed = 0
+    for event_id in event_ids:
+        try:
+            with transaction.atomic():
+                event = OutboxEvent.objects.select_for_update().filter(
+                    pk=event_id, processed_at__isnull=True
+                ).first()
+                if event is None:
+                    continue
+                HANDLERS[event.topic](**event.payload)
+                event.processed_at = timezone.now()
+                event.save(update_fields=['processed_at'])
+        except Exception as exc:
+            logger.exception("Outbox event %s failed", event_id)
+            OutboxEvent.objects.filter(pk=event_id).update(last_error=repr(exc)[:1000])
+            attempts = OutboxEvent.objects.filter(pk=event_id).values_list('attempts', flat=True).first()
+            if attempts is not None and attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                # claim_batch() never picks it up again, so this is logged once.
+                logger.error("Outbox event %s gave up after %s attempts", event_id, attempts)
+        else:
+            processed += 1
+    return processed
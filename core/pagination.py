@@ -0,0 +1,82 @@
+import binascii
+from base64 import b64decode, b64encode
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key.
+
+    Each page is fetched with `WHERE id > <cursor> ORDER BY id LIMIT n`,
+    so the cost of a page does not depend on how deep into the table it is.
+    """
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class CreatedAtKeysetPagination(BasePagination):
+    """
+    Newest-first keyset pagination on (created_at, id).
+
+    The cursor holds the last row's created_at and id, and the next page is
+    `WHERE (created_at, id) < (cursor) ORDER BY created_at DESC, id DESC LIMIT n`,
+    which an index on (..., -created_at, -id) answers without scanning the
+    rows before it. Only forward links are offered.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by('-created_at', '-id')
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            created_at, pk = position
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+        rows = list(queryset[:page_size + 1])
+        page = rows[:page_size]
+        self.next_position = (page[-1].created_at, page[-1].pk) if len(rows) > page_size else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param], self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = b64decode(encoded.encode()).decode().split('|')
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        created_at, pk = position
+        return b64encode(f'{created_at.isoformat()}|{pk}'.encode()).decode()
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
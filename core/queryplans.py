@@ -0,0 +1,71 @@
+import json
+import re
+
+from django.db import connection
+from django.db.models import Count
+
+from .models import User, Course, CourseTeacher, Enrollment, CourseSchedule, Notification
+from .scheduling import SLOT_FIELDS, Slot, overlapping_bookings
+
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)$')
+
+
+def hot_queries():
+    """
+    The main query behind each endpoint, built with real ids from the
+    database, as (name, queryset) pairs. Keep these in step with the views.
+    """
+    teacher = User.objects.filter(role='teacher').order_by('id').first()
+    student = Enrollment.objects.order_by('id').values_list('student_id', flat=True).first()
+    course = Course.objects.order_by('id').values_list('id', flat=True).first()
+    schedule = CourseSchedule.objects.order_by('id').first()
+    notification = Notification.objects.order_by('id').first()
+    if None in (teacher, student, course, schedule, notification):
+        raise ValueError("The database needs at least one teacher, enrollment, schedule and notification.")
+
+    return [
+        ('admin user list', User.objects.filter(role='student', id__gt=0).order_by('id')[:50]),
+        ('admin role counts', User.objects.filter(role__in=['student', 'teacher']).values('role').annotate(count=Count('id')).order_by()),
+        ('admin course teachers', CourseTeacher.objects.filter(course_id__in=[course]).values_list('course_id', 'teacher__username')),
+        ('admin course students', Enrollment.objects.filter(course_id__in=[course]).values_list('course_id', 'student__username')),
+        ('student enrolled courses', Course.objects.filter(students=student).order_by('id').values_list('id', flat=True)),
+        ('student timetable', CourseSchedule.objects.filter(
+            course__enrollments__student_id=student, course__enrollments__status='active'
+        ).values_list('id', 'course__title', 'teacher__username')),
+        ('teacher assigned courses', Course.objects.filter(teachers=teacher).order_by('id').values_list('id', flat=True)),
+        ('teacher schedules', CourseSchedule.objects.filter(teacher=teacher, course_id__in=[course])),
+        ('teacher rosters', Enrollment.objects.filter(course__teachers=teacher).order_by('course_id', 'id').values(
+            'course_id', 'student__username', 'student__email', 'status', 'enrolled_at'
+        )),
+        ('timetable audience', Enrollment.objects.filter(course_id__in=[course], status='active').values_list('student_id', 'course_id')),
+        ('schedule conflicts', overlapping_bookings(
+            Slot(None, *(getattr(schedule, field) for field in SLOT_FIELDS[1:]))
+        )),
+        ('notification inbox', Notification.objects.filter(user_id=notification.user_id).order_by('-created_at', '-id')[:50]),
+        ('unread notifications', Notification.objects.filter(
+            user_id=notification.user_id, is_read=False
+        ).order_by('-created_at', '-id')[:50]),
+    ]
+
+
+def explain(queryset):
+    if connection.vendor == 'postgresql':
+        return queryset.explain(format='json')
+    return queryset.explain()
+
+
+def sequential_scans(plan):
+    """Return the tables a plan from explain() reads with a full sequential scan."""
+    if connection.vendor == 'postgresql':
+        tables = []
+        nodes = [json.loads(plan)[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if node['Node Type'] == 'Seq Scan':
+                tables.append(node['Relation Name'])
+            nodes.extend(node.get('Plans', []))
+        return tables
+    if connection.vendor == 'sqlite':
+        # "SCAN <table>" is a table scan; index scans read "SCAN <table> USING ... INDEX".
+        return [match.group(1) for line in plan.splitlines() if (match := SQLITE_SCAN.search(line.strip()))]
+    raise NotImplementedError(f"Plan checks are not implemented for {connection.vendor}.")
@@ -0,0 +1,57 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from .versioning import get_versions, group_version_name
+
+# Entries are {'data', 'validators'}; bump the prefix when that shape changes.
+RESPONSE_KEY = 'response:v2:{}'
+
+
+class VersionedResponseCacheMixin:
+    """
+    Read-through cache for list/retrieve responses.
+
+    Entries are keyed by view, action, URL kwargs, query params and the
+    current version of every model group in `cache_groups`. Signals bump a
+    group's version whenever one of its rows changes (see core.signals), so
+    a stale entry is simply never read again and expires on its own.
+    Only use it where the response does not depend on who is asking.
+    """
+    cache_groups = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_response_cache_key(self, request, **kwargs):
+        versions = get_versions(group_version_name(group) for group in self.cache_groups)
+        parts = (
+            type(self).__module__, type(self).__name__, self.action, request.get_host(),
+            sorted(kwargs.items()), sorted(request.query_params.lists()), versions,
+        )
+        return RESPONSE_KEY.format(hashlib.md5(repr(parts).encode()).hexdigest())
+
+    def get_cached_entry(self, request, **kwargs):
+        """(key, entry) for this request; looked up once, as conditional GET may need it first."""
+        if getattr(self, 'cached_entry', None) is None:
+            key = self.get_response_cache_key(request, **kwargs)
+            self.cached_entry = key, cache.get(key)
+        return self.cached_entry
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key, entry = self.get_cached_entry(request, **kwargs)
+        if entry is not None:
+            return Response(entry['data'])
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            # ConditionalGetMixin leaves the ETag and Last-Modified it computed on the view.
+            entry = {'data': response.data, 'validators': getattr(self, 'validators', None)}
+            cache.set(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
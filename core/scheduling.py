@@ -0,0 +1,79 @@
+from collections import defaultdict, namedtuple
+
+from django.db.models import Q
+from django.db.models.functions import Trim, Upper
+
+from .models import CourseSchedule
+
+Slot = namedtuple('Slot', ['id', 'course_id', 'teacher_id', 'day_of_week', 'start_time', 'end_time', 'location'])
+Conflict = namedtuple('Conflict', ['kind', 'slot', 'other'])
+
+SLOT_FIELDS = list(Slot._fields)
+
+
+def slot_keys(slot):
+    """The resources a slot occupies: its teacher and its room, on its day."""
+    return [
+        ('teacher', slot.teacher_id, slot.day_of_week),
+        ('location', slot.location.strip().casefold(), slot.day_of_week),
+    ]
+
+
+def overlapping_bookings(slot):
+    """Stored bookings of the slot's teacher or room that overlap it on its day."""
+    return CourseSchedule.objects.alias(room=Upper(Trim('location'))).filter(
+        Q(teacher_id=slot.teacher_id) | Q(room=slot.location.strip().upper()),
+        day_of_week=slot.day_of_week,
+        start_time__lt=slot.end_time,
+        end_time__gt=slot.start_time,
+    ).exclude(pk=slot.id)
+
+
+def booked_conflicts(slot):
+    """
+    Conflicts between `slot` and the bookings already stored, at most one
+    per resource. The overlap test runs in SQL, so only clashing rows are
+    read; find_conflicts() is for sweeping whole timetables.
+    """
+    room = slot.location.strip().upper()
+    found = {}
+    for other in map(Slot._make, overlapping_bookings(slot).order_by('start_time', 'id').values_list(*SLOT_FIELDS)):
+        if other.teacher_id == slot.teacher_id:
+            found.setdefault('teacher', Conflict('teacher', slot, other))
+        if other.location.strip().upper() == room:
+            found.setdefault('location', Conflict('location', slot, other))
+    return [found[kind] for kind in ('teacher', 'location') if kind in found]
+
+
+def find_conflicts(slots):
+    """
+    Sweep a whole timetable for teacher and location double bookings.
+
+    Slots are grouped per resource and day, sorted once and swept while
+    tracking the booking that ends last, so the audit is O(n log n).
+    Each overlapping pair is reported once.
+    """
+    groups = defaultdict(list)
+    for slot in slots:
+        for key in slot_keys(slot):
+            groups[key].append(slot)
+
+    conflicts = []
+    for key, group in groups.items():
+        group.sort(key=lambda s: (s.start_time, s.end_time))
+        active = []
+        for slot in group:
+            active = [other for other in active if other.end_time > slot.start_time]
+            conflicts.extend(Conflict(key[0], slot, other) for other in active)
+            active.append(slot)
+    return conflicts
+
+
+def describe_conflict(conflict):
+    other = conflict.other
+    day = dict(CourseSchedule.DAYS_OF_WEEK)[other.day_of_week]
+    when = f"{day} {other.start_time:%H:%M}-{other.end_time:%H:%M}"
+    if conflict.kind == 'teacher':
+        return f"Teacher is already booked on {when} (schedule {other.id})."
+    return f"Location '{other.location}' is already booked on {when} (schedule {other.id})."
+
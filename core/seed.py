@@ -0,0 +1,111 @@
+import random
+import uuid
+from datetime import time
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .counters import reset_role_counts
+from .signals import MODEL_GROUPS
+from .stats import rebuild_enrollment_stats
+from .versioning import bump_versions, group_version_name
+from .models import User, Course, CourseTeacher, Enrollment, CourseSchedule, Notification
+
+SEED_BATCH_SIZE = 5000
+
+
+def _insert(model, objects, batch_size):
+    """bulk_create an iterable a batch at a time, so large seeds never sit in memory at once."""
+    objects = iter(objects)
+    created = []
+    while batch := list(islice(objects, batch_size)):
+        created.extend(obj.pk for obj in model.objects.bulk_create(batch))
+    return created
+
+
+def seed_dataset(students=1000, teachers=50, courses=100, enrollments_per_student=5,
+                 schedules_per_course=2, notifications_per_user=5, seed=0, batch_size=SEED_BATCH_SIZE):
+    """
+    Insert a synthetic school with bulk_create and return the new ids by kind.
+
+    Rows are namespaced by a random prefix so a seed can be added to a
+    database that already holds data. Every seeded user shares one
+    password hash (the password is "password"). Signals do not run, so
+    the cached role counts are reset and cached responses invalidated afterwards.
+    """
+    rng = random.Random(seed)
+    prefix = f'seed{uuid.uuid4().hex[:6]}'
+    password = make_password('password')
+
+    teacher_ids = _insert(User, (
+        User(username=f'{prefix}_teacher{i}', email=f'{prefix}_teacher{i}@example.com',
+             role='teacher', password=password, department='Science')
+        for i in range(teachers)
+    ), batch_size)
+    student_ids = _insert(User, (
+        User(username=f'{prefix}_student{i}', email=f'{prefix}_student{i}@example.com',
+             role='student', password=password, enrollment_year=2020 + i % 6, batch=f'B{i % 40}')
+        for i in range(students)
+    ), batch_size)
+    course_ids = _insert(Course, (
+        Course(title=f'{prefix} Course {i}', description='Seeded course', duration=rng.randint(10, 60))
+        for i in range(courses)
+    ), batch_size)
+
+    course_teachers = {
+        course_id: rng.sample(teacher_ids, min(len(teacher_ids), rng.randint(1, 2)))
+        for course_id in course_ids
+    } if teacher_ids else {}
+    _insert(CourseTeacher, (
+        CourseTeacher(course_id=course_id, teacher_id=teacher_id)
+        for course_id, assigned in course_teachers.items() for teacher_id in assigned
+    ), batch_size)
+
+    # Weekday hours 8:00-18:00; a course never has two classes in the same slot.
+    slots = [(day, hour) for day in range(5) for hour in range(8, 18)]
+
+    def schedules():
+        for course_id, assigned in course_teachers.items():
+            for day, start in rng.sample(slots, min(schedules_per_course, len(slots))):
+                yield CourseSchedule(
+                    course_id=course_id, teacher_id=rng.choice(assigned), day_of_week=day,
+                    start_time=time(start), end_time=time(start + 1), location=f'Room {rng.randint(1, 200)}'
+                )
+    _insert(CourseSchedule, schedules(), batch_size)
+
+    def enrollments():
+        per_student = min(enrollments_per_student, len(course_ids))
+        for student_id in student_ids:
+            for course_id in rng.sample(course_ids, per_student):
+                status = rng.choices(['active', 'completed', 'dropped'], weights=[8, 1, 1])[0]
+                yield Enrollment(student_id=student_id, course_id=course_id, status=status)
+    enrollment_ids = _insert(Enrollment, enrollments(), batch_size)
+
+    def notifications():
+        for user_id in teacher_ids + student_ids:
+            for i in range(notifications_per_user):
+                yield Notification(
+                    user_id=user_id, notif_type=rng.choice(['general', 'course', 'enrollment', 'account']),
+                    title=f'Notice {i}', message='Seeded notification', is_read=rng.random() < 0.7,
+                    related_course_id=rng.choice(course_ids) if course_ids else None
+                )
+    notification_ids = _insert(Notification, notifications(), batch_size)
+
+    # Counters the signals would normally maintain.
+    unread = Notification.objects.filter(user=OuterRef('pk'), is_read=False).values('user').annotate(
+        count=Count('id')
+    ).values('count')
+    User.objects.filter(username__startswith=f'{prefix}_').update(unread_notifications=Coalesce(Subquery(unread), 0))
+    reset_role_counts()
+    rebuild_enrollment_stats()
+    bump_versions(group_version_name(group) for group in MODEL_GROUPS.values())
+
+    return {
+        'teachers': teacher_ids,
+        'students': student_ids,
+        'courses': course_ids,
+        'enrollments': enrollment_ids,
+        'notifications': notification_ids,
+    }
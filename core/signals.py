@@ -0,0 +1,225 @@
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import User, Course, CourseTeacher, Enrollment, CourseSchedule, Notification, EnrollmentStat
+from .conditional import touch_courses
+from .counters import adjust_role_count
+from .notifications import adjust_unread_counts, forget_unread
+from .versioning import bump_versions, course_version_name, student_version_name, group_version_name
+from . import stats, timetable
+
+# Model groups behind the cached admin read endpoints (core.responsecache).
+MODEL_GROUPS = {
+    User: 'users',
+    Course: 'courses',
+    CourseTeacher: 'course_teachers',
+    Enrollment: 'enrollments',
+    CourseSchedule: 'schedules',
+}
+
+# Saves that only touch these never change a cached admin response.
+UNCACHED_USER_FIELDS = {'last_login', 'password', 'unread_notifications'}
+
+
+def model_group_changed(sender, instance, update_fields=None, **kwargs):
+    if sender is User and update_fields and set(update_fields) <= UNCACHED_USER_FIELDS:
+        return
+    bump_versions([group_version_name(MODEL_GROUPS[sender])])
+
+
+for model in MODEL_GROUPS:
+    post_save.connect(model_group_changed, sender=model, dispatch_uid=f'model_group_saved.{model.__name__}')
+    post_delete.connect(model_group_changed, sender=model, dispatch_uid=f'model_group_deleted.{model.__name__}')
+
+
+COHORT_FIELDS = ('batch', 'enrollment_year', 'department')
+
+
+@receiver(pre_save, sender=User)
+def remember_user(sender, instance, update_fields=None, **kwargs):
+    instance._previous_role = instance._previous_cohort = None
+    if not instance.pk:
+        return
+    fields = set(COHORT_FIELDS if update_fields is None else update_fields)
+    needs_role = update_fields is None or 'role' in fields
+    needs_cohort = instance.role == 'student' and set(COHORT_FIELDS) & fields
+    if needs_role or needs_cohort:
+        previous = User.objects.filter(pk=instance.pk).values_list('role', *COHORT_FIELDS).first()
+        if previous:
+            instance._previous_role = previous[0]
+            if needs_cohort:
+                instance._previous_cohort = previous[1:]
+
+
+@receiver(post_save, sender=User)
+def student_cohort_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_cohort', None)
+    if previous:
+        # Enrollment stats count students by cohort and department.
+        stats.student_moved(instance.pk, previous, tuple(getattr(instance, field) for field in COHORT_FIELDS))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        adjust_role_count(instance.role, 1)
+    elif instance._previous_role and instance._previous_role != instance.role:
+        adjust_role_count(instance._previous_role, -1)
+        adjust_role_count(instance.role, 1)
+
+    shown_fields = {'username', 'first_name', 'last_name', 'email'}
+    if created or not (update_fields is None or shown_fields & set(update_fields)):
+        return
+    if instance.role == 'teacher':
+        # Teacher details are shown on the courses and schedules they teach.
+        course_ids = list(Course.objects.filter(
+            Q(teachers=instance) | Q(schedules__teacher=instance)
+        ).values_list('id', flat=True).distinct())
+        bump_versions(course_version_name(course_id) for course_id in course_ids)
+        touch_courses(course_ids)
+        timetable.refresh_schedules(CourseSchedule.objects.filter(teacher=instance))
+    elif instance.role == 'student':
+        # Admin course responses list student usernames.
+        touch_courses(Enrollment.objects.filter(student=instance).values_list('course_id', flat=True))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    adjust_role_count(instance.role, -1)
+    timetable.forget_timetable(instance.pk)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    bump_versions([course_version_name(instance.pk)])
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, **kwargs):
+    # Its enrollments were counted out as they cascaded; drop the empty rows.
+    EnrollmentStat.objects.filter(dimension='course', key=str(instance.pk)).delete()
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, created, **kwargs):
+    if not created:
+        # Timetables show the course title.
+        timetable.refresh_schedules(CourseSchedule.objects.filter(course=instance))
+
+
+@receiver(post_save, sender=CourseTeacher)
+@receiver(post_delete, sender=CourseTeacher)
+def course_teacher_changed(sender, instance, **kwargs):
+    bump_versions([course_version_name(instance.course_id)])
+    touch_courses([instance.course_id])
+
+
+@receiver(post_save, sender=CourseTeacher)
+def course_teacher_saved(sender, instance, **kwargs):
+    timetable.teachers_assigned(instance.course_id, [instance.teacher_id])
+
+
+@receiver(post_delete, sender=CourseTeacher)
+def course_teacher_deleted(sender, instance, **kwargs):
+    timetable.remove_course([instance.teacher_id], instance.course_id)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def enrollment_changed(sender, instance, signal, **kwargs):
+    bump_versions([student_version_name(instance.student_id)])
+    # Course responses list the students but not their status, so a status
+    # change leaves the course as it was.
+    previous = None if signal is post_delete else getattr(instance, '_previous_enrollment', None)
+    if previous is None or previous[:2] != (instance.student_id, instance.course_id):
+        touch_courses({instance.course_id, previous[1] if previous else None})
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, **kwargs):
+    timetable.enrollments_changed([(instance.student_id, instance.course_id, instance.status)])
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    timetable.remove_course([instance.student_id], instance.course_id)
+    stats.enrollments_counted([(instance.student_id, instance.course_id, instance.status)], -1)
+
+
+@receiver(pre_save, sender=Enrollment)
+def remember_enrollment(sender, instance, **kwargs):
+    instance._previous_enrollment = None
+    if instance.pk:
+        instance._previous_enrollment = Enrollment.objects.filter(pk=instance.pk).values_list(
+            'student_id', 'course_id', 'status'
+        ).first()
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_counted(sender, instance, **kwargs):
+    current = (instance.student_id, instance.course_id, instance.status)
+    previous = getattr(instance, '_previous_enrollment', None)
+    if previous != current:
+        profiles = stats.student_profiles({current[0], previous[0] if previous else current[0]})
+        deltas = stats.enrollment_deltas([current], 1, profiles)
+        if previous:
+            deltas.update(stats.enrollment_deltas([previous], -1, profiles))
+        stats.record_stat_deltas(deltas)
+
+
+@receiver(pre_save, sender=CourseSchedule)
+def remember_schedule_course(sender, instance, **kwargs):
+    instance._previous_course_id = instance._previous_teacher_id = None
+    if instance.pk:
+        instance._previous_course_id, instance._previous_teacher_id = CourseSchedule.objects.filter(
+            pk=instance.pk
+        ).values_list('course_id', 'teacher_id').first() or (None, None)
+
+
+@receiver(post_save, sender=CourseSchedule)
+@receiver(post_delete, sender=CourseSchedule)
+def schedule_changed(sender, instance, **kwargs):
+    course_ids = {instance.course_id, getattr(instance, '_previous_course_id', None)}
+    bump_versions(course_version_name(course_id) for course_id in course_ids if course_id)
+    touch_courses(course_ids)
+
+
+@receiver(post_save, sender=CourseSchedule)
+def schedule_saved(sender, instance, **kwargs):
+    previous = (instance._previous_course_id, instance._previous_teacher_id)
+    if previous[0] and previous != (instance.course_id, instance.teacher_id):
+        # The class moved to another course or teacher: take it off the old timetables first.
+        timetable.remove_schedule(instance.pk, *previous)
+    timetable.refresh_schedules(CourseSchedule.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=CourseSchedule)
+def schedule_deleted(sender, instance, **kwargs):
+    timetable.remove_schedule(instance.pk, instance.course_id, instance.teacher_id)
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, **kwargs):
+    # fan_out() counts its own rows; this covers one-off creates. Deletes are
+    # counted from the rows that cascade them (below), which keeps the
+    # notification delete itself a single bulk DELETE.
+    if created and not instance.is_read:
+        adjust_unread_counts({instance.user_id: 1})
+
+
+@receiver(pre_delete, sender=Course)
+def course_notifications_deleted(sender, instance, **kwargs):
+    forget_unread(Notification.objects.filter(Q(related_course=instance) | Q(related_enrollment__course=instance)))
+
+
+@receiver(pre_delete, sender=Enrollment)
+def enrollment_notifications_deleted(sender, instance, **kwargs):
+    forget_unread(Notification.objects.filter(related_enrollment=instance))
+
+
+@receiver(pre_delete, sender=User)
+def user_notifications_deleted(sender, instance, **kwargs):
+    # The user's own counter goes with them; others may hold notices about their enrollments.
+    forget_unread(Notification.objects.filter(related_enrollment__student=instance).exclude(user=instance))
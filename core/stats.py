@@ -0,0 +1,154 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import User, Course, Enrollment, EnrollmentStat
+from .outbox import emit, handles
+
+STATS_TOPIC = 'enrollment.stats'
+
+
+def cohort_key(enrollment_year, batch):
+    return f"{enrollment_year or ''}/{batch or ''}"
+
+
+def parse_cohort_key(key):
+    enrollment_year, batch = key.split('/', 1)
+    return int(enrollment_year) if enrollment_year else None, batch or None
+
+
+def student_keys(student):
+    """(cohort key, department key) for a (batch, enrollment_year, department) tuple."""
+    batch, enrollment_year, department = student
+    return cohort_key(enrollment_year, batch), department or ''
+
+
+def student_profiles(student_ids):
+    return {
+        row[0]: row[1:]
+        for row in User.objects.filter(pk__in=set(student_ids)).values_list('id', 'batch', 'enrollment_year', 'department')
+    }
+
+
+def enrollment_deltas(enrollments, sign, profiles=None):
+    """
+    Counter of (dimension, key, status) -> `sign` for each (student_id,
+    course_id, status) in `enrollments`.
+    """
+    enrollments = list(enrollments)
+    if profiles is None:
+        profiles = student_profiles(student_id for student_id, _, _ in enrollments)
+    deltas = Counter()
+    for student_id, course_id, status in enrollments:
+        cohort, department = student_keys(profiles.get(student_id, (None, None, None)))
+        deltas['course', str(course_id), status] += sign
+        deltas['cohort', cohort, status] += sign
+        deltas['department', department, status] += sign
+    return deltas
+
+
+def apply_stat_deltas(deltas):
+    """
+    Add `deltas` to the stored counts: one UPDATE per changed row, plus
+    an insert for rows seen for the first time.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        EnrollmentStat.objects.bulk_create(
+            [EnrollmentStat(dimension=dimension, key=key, status=status) for dimension, key, status in deltas],
+            ignore_conflicts=True,
+        )
+        # A fixed order, so concurrent writers lock the rows in the same order.
+        for (dimension, key, status), delta in sorted(deltas.items()):
+            EnrollmentStat.objects.filter(dimension=dimension, key=key, status=status).update(count=F('count') + delta)
+
+
+def record_stat_deltas(deltas):
+    """
+    Queue `deltas` through the outbox. Call it inside the transaction that
+    changes the enrollments: the event commits with them, and the shared
+    cohort and department rows are updated by the relay's workers rather
+    than locked for the rest of the writer's transaction.
+    """
+    deltas = [[*key, delta] for key, delta in deltas.items() if delta]
+    if deltas:
+        emit(STATS_TOPIC, deltas=deltas)
+
+
+@handles(STATS_TOPIC)
+def stat_deltas_recorded(deltas):
+    deltas = {tuple(key): delta for *key, delta in deltas}
+    # A deleted course's rows are dropped with it; late decrements would bring them back.
+    course_keys = {key for dimension, key, _ in deltas if dimension == 'course'}
+    courses = {str(pk) for pk in Course.objects.filter(pk__in=course_keys).values_list('pk', flat=True)}
+    apply_stat_deltas({
+        (dimension, key, status): delta for (dimension, key, status), delta in deltas.items()
+        if dimension != 'course' or key in courses
+    })
+
+
+def enrollments_counted(enrollments, sign=1):
+    """Count (student_id, course_id, status) rows in (sign=1) or out (sign=-1)."""
+    record_stat_deltas(enrollment_deltas(enrollments, sign))
+
+
+def student_moved(student_id, before, after):
+    """
+    Move a student's enrollments to another cohort or department;
+    `before` and `after` are (batch, enrollment_year, department) tuples.
+    """
+    if student_keys(before) == student_keys(after):
+        return
+    enrollments = list(Enrollment.objects.filter(student_id=student_id).values_list('student_id', 'course_id', 'status'))
+    deltas = enrollment_deltas(enrollments, -1, {student_id: before})
+    deltas.update(enrollment_deltas(enrollments, 1, {student_id: after}))
+    # The course counts cancel out; only the cohort and department rows move.
+    record_stat_deltas(deltas)
+
+
+def rebuild_enrollment_stats():
+    """
+    Recount everything from Enrollment with three grouped queries and
+    replace the stored counts. Returns the number of rows written.
+    Changes still waiting in the outbox are applied on top, so run it
+    with the relay drained.
+    """
+    enrollments = Enrollment.objects.order_by()
+    grouped = {
+        'course': enrollments.values_list('course_id', 'status'),
+        'cohort': enrollments.values_list('student__enrollment_year', 'student__batch', 'status'),
+        'department': enrollments.values_list('student__department', 'status'),
+    }
+    deltas = Counter()
+    for dimension, queryset in grouped.items():
+        for *parts, status, total in queryset.annotate(total=Count('id')):
+            if dimension == 'course':
+                key = str(parts[0])
+            elif dimension == 'cohort':
+                key = cohort_key(*parts)
+            else:
+                key = parts[0] or ''
+            deltas[dimension, key, status] += total
+
+    rows = [
+        EnrollmentStat(dimension=dimension, key=key, status=status, count=total)
+        for (dimension, key, status), total in deltas.items()
+    ]
+    with transaction.atomic():
+        EnrollmentStat.objects.all().delete()
+        EnrollmentStat.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def enrollment_stats(dimension):
+    """{key: {status: count, ..., 'total': n}} for one dimension, skipping empty rows."""
+    stats = {}
+    for key, status, count in EnrollmentStat.objects.filter(dimension=dimension, count__gt=0).values_list('key', 'status', 'count'):
+        row = stats.setdefault(key, dict.fromkeys([choice for choice, _ in Enrollment.STATUS_CHOICES], 0))
+        row[status] = count
+    for row in stats.values():
+        row['total'] = sum(row.values())
+    return stats
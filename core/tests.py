@@ -1,3 +1,254 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from datetime import time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .benchmarks import ENDPOINTS, make_clients, route_names, sample_context
+from .models import User, Course, Enrollment, EnrollmentStat, OutboxEvent
+from .outbox import HANDLERS, deliver, emit, relay
+from .seed import seed_dataset
+from .stats import rebuild_enrollment_stats
+from .scheduling import Slot, find_conflicts
+
+
+def slot(id, start, end, teacher_id=1, location='Room 1', day_of_week=0):
+    return Slot(id, 1, teacher_id, day_of_week, time(start), time(end), location)
+
+
+class FindConflictsTests(SimpleTestCase):
+    def test_sweep_reports_each_pair_once(self):
+        slots = [slot(1, 8, 10), slot(2, 9, 11, location='Room 2'), slot(3, 10, 11, teacher_id=2)]
+        pairs = {(c.kind, c.slot.id, c.other.id) for c in find_conflicts(slots)}
+        self.assertEqual(pairs, {('teacher', 2, 1)})
+
+
+class ExplainQueriesTests(TestCase):
+    def test_hot_queries_use_indexes_and_seed_is_rolled_back(self):
+        out = io.StringIO()
+        call_command('explain_queries', students=200, teachers=10, courses=20, stdout=out)
+        self.assertIn("All 13 queries use indexes.", out.getvalue())
+        self.assertFalse(User.objects.exists())
+
+
+class BenchEndpointsTests(TestCase):
+    def test_every_route_has_a_benchmark(self):
+        self.assertEqual(route_names() - {endpoint.url_name for endpoint in ENDPOINTS}, set())
+
+    def test_writes_then_compares_a_baseline(self):
+        seed_dataset(students=30, teachers=4, courses=5, enrollments_per_student=2)
+        cache.set('bench_sentinel', 1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            options = {'iterations': 2, 'only': ['student-timetable', 'admin-user-list'], 'baseline': path}
+            call_command('bench_endpoints', stdout=io.StringIO(), **options)
+            with open(path) as f:
+                baseline = json.load(f)['endpoints']
+            self.assertEqual(set(baseline), {'GET student-timetable', 'GET admin-user-list'})
+            self.assertEqual(baseline['GET admin-user-list']['status'], [200])
+
+            out = io.StringIO()
+            call_command('bench_endpoints', stdout=out, tolerance=100, min_delta_ms=1000, **options)
+            self.assertIn("No regressions", out.getvalue())
+        # The run used its own cache and left the shared one alone.
+        self.assertEqual(cache.get('bench_sentinel'), 1)
+
+
+class AsyncReadViewTests(TestCase):
+    def test_async_routes_match_their_sync_views(self):
+        seed_dataset(students=20, teachers=3, courses=4, enrollments_per_student=2)
+        ctx = sample_context()
+        clients = make_clients(ctx)
+        pairs = [
+            ('student-enrolled-courses', 'student'),
+            ('student-profile', 'student'),
+            ('teacher-assigned-courses', 'teacher'),
+            ('teacher-profile', 'teacher'),
+            ('course-list', 'admin'),
+        ]
+        for name, role in pairs:
+            with self.subTest(name):
+                expected = clients[role].get(reverse(name))
+                response = clients[role].get(reverse(f'{name}-async'))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected.json())
+
+    def test_async_routes_authenticate_and_check_roles(self):
+        seed_dataset(students=5, teachers=2, courses=2, enrollments_per_student=1)
+        clients = make_clients(sample_context())
+        self.assertEqual(clients[None].get(reverse('student-profile-async')).status_code, 401)
+        self.assertEqual(clients['teacher'].get(reverse('student-profile-async')).status_code, 403)
+        self.assertEqual(clients['student'].get(reverse('course-list-async')).status_code, 403)
+        self.assertEqual(clients['student'].post(reverse('student-profile-async')).status_code, 405)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.student = User.objects.create_user('student', 'student@example.com', 'pass', role='student')
+        self.course = Course.objects.create(title='Algebra', description='Basics', duration=10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def relay(self):
+        # The relay sends each batch once its claim commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            return relay(deliver)
+
+    def test_events_are_sent_once_after_the_write(self):
+        response = self.client.post(
+            reverse('enroll-student'), {'student_id': self.student.id, 'course_id': self.course.id}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+
+        out = io.StringIO()
+        # Deliver inline rather than through the broker.
+        with mock.patch('admin.task.deliver_outbox_events.delay', side_effect=deliver):
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('relay_outbox', once=True, stdout=out)
+        # The enrollment notice and its stats change.
+        self.assertIn("Relayed 2 events.", out.getvalue())
+        self.assertEqual(mail.outbox[0].to, ['student@example.com'])
+        self.assertEqual(EnrollmentStat.objects.get(dimension='course', status='active').count, 1)
+
+        event = OutboxEvent.objects.get(topic='enrollment.created')
+        self.assertEqual(event.attempts, 1)
+        self.assertIsNotNone(event.processed_at)
+        # A duplicate delivery is a no-op.
+        self.assertEqual(deliver([event.id]), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_batches_are_sent_after_the_claim_commits(self):
+        event = emit('enrollment.created', student_id=self.student.id, course_id=self.course.id)
+        sent = []
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(relay(sent.extend), 1)
+            self.assertEqual(sent, [])
+        self.assertEqual(sent, [event.id])
+
+    def test_failed_events_are_redelivered(self):
+        calls = []
+
+        def flaky(**payload):
+            calls.append(payload)
+            if len(calls) == 1:
+                raise ConnectionError("SMTP down")
+
+        with mock.patch.dict(HANDLERS, {'test.flaky': flaky}):
+            event = emit('test.flaky', n=1)
+            with self.assertLogs('core.outbox', 'ERROR'):
+                self.assertEqual(self.relay(), 1)
+            event.refresh_from_db()
+            self.assertIsNone(event.processed_at)
+            self.assertIn("SMTP down", event.last_error)
+
+            # Not due again until the redelivery timeout has passed.
+            self.assertEqual(self.relay(), 0)
+            OutboxEvent.objects.update(dispatched_at=timezone.now() - timedelta(hours=1))
+            self.assertEqual(self.relay(), 1)
+
+        event.refresh_from_db()
+        self.assertEqual((event.attempts, len(calls)), (2, 2))
+        self.assertIsNotNone(event.processed_at)
+
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2)
+    def test_giving_up_is_logged_once(self):
+        def broken(**payload):
+            raise ConnectionError("SMTP down")
+
+        with mock.patch.dict(HANDLERS, {'test.broken': broken}):
+            event = emit('test.broken')
+            with self.assertLogs('core.outbox', 'ERROR') as logs:
+                for _ in range(3):
+                    self.relay()
+                    OutboxEvent.objects.update(dispatched_at=timezone.now() - timedelta(hours=1))
+        given_up = [line for line in logs.output if 'gave up' in line]
+        self.assertEqual(given_up, [f"ERROR:core.outbox:Outbox event {event.id} gave up after 2 attempts"])
+
+class EnrollmentStatTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.ada = User.objects.create_user(
+            'ada', 'ada@example.com', 'pass', role='student', batch='A', enrollment_year=2024, department='Maths'
+        )
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pass', role='student')
+        self.algebra = Course.objects.create(title='Algebra', description='', duration=10)
+        self.physics = Course.objects.create(title='Physics', description='', duration=10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def stored(self):
+        # Stats changes are applied by the outbox relay.
+        with self.captureOnCommitCallbacks(execute=True):
+            relay(deliver)
+        return set(EnrollmentStat.objects.filter(count__gt=0).values_list('dimension', 'key', 'status', 'count'))
+
+    def assert_matches_rebuild(self):
+        before = self.stored()
+        rebuild_enrollment_stats()
+        self.assertEqual(before, self.stored())
+
+    def test_counts_follow_enrollment_changes(self):
+        enrollment = Enrollment.objects.create(student=self.ada, course=self.algebra)
+        # The write only queues the change; the shared rows are not touched.
+        self.assertFalse(EnrollmentStat.objects.exists())
+        Enrollment.objects.create(student=self.bob, course=self.algebra)
+        Enrollment.objects.create(student=self.ada, course=self.physics, status='completed')
+        self.assert_matches_rebuild()
+
+        enrollment.status = 'dropped'
+        enrollment.save()
+        self.ada.department = 'Physics'
+        self.ada.save(update_fields=['department'])
+        self.assert_matches_rebuild()
+        self.assertIn(('department', 'Physics', 'dropped', 1), self.stored())
+
+        enrollment.delete()
+        self.physics.delete()
+        self.assert_matches_rebuild()
+        self.assertEqual(self.stored(), {
+            ('course', str(self.algebra.pk), 'active', 1), ('cohort', '/', 'active', 1), ('department', '', 'active', 1),
+        })
+
+    def test_bulk_enroll_and_endpoint(self):
+        response = self.client.post(reverse('bulk-enroll-students'), [
+            {'student_id': self.ada.pk, 'course_id': self.algebra.pk},
+            {'student_id': self.bob.pk, 'course_id': self.algebra.pk, 'status': 'completed'},
+            {'student_id': self.ada.pk, 'course_id': self.physics.pk},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assert_matches_rebuild()
+
+        response = self.client.get(reverse('admin-enrollment-stats'))
+        self.assertEqual(response.data['by_course'], [
+            {'course_id': self.algebra.pk, 'title': 'Algebra', 'active': 1, 'completed': 1, 'dropped': 0, 'total': 2},
+            {'course_id': self.physics.pk, 'title': 'Physics', 'active': 1, 'completed': 0, 'dropped': 0, 'total': 1},
+        ])
+        self.assertEqual(response.data['by_cohort'], [
+            {'enrollment_year': None, 'batch': None, 'active': 0, 'completed': 1, 'dropped': 0, 'total': 1},
+            {'enrollment_year': 2024, 'batch': 'A', 'active': 2, 'completed': 0, 'dropped': 0, 'total': 2},
+        ])
+        response = self.client.get(reverse('admin-enrollment-stats'), {'dimension': 'department'})
+        self.assertEqual(list(response.data), ['by_department'])
+        self.assertEqual([row['department'] for row in response.data['by_department']], [None, 'Maths'])
+        self.assertEqual(self.client.get(reverse('admin-enrollment-stats'), {'dimension': 'teacher'}).status_code, 400)
+
+    def test_rebuild_command_repairs_drift(self):
+        Enrollment.objects.create(student=self.ada, course=self.algebra)
+        expected = self.stored()
+        EnrollmentStat.objects.update(count=7)
+        out = io.StringIO()
+        call_command('rebuild_enrollment_stats', stdout=out)
+        self.assertIn("Rebuilt 3 enrollment stat rows", out.getvalue())
+        self.assertEqual(self.stored(), expected)
@@ -0,0 +1,234 @@
+from bisect import insort
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CourseSchedule, CourseTeacher, Enrollment
+from .versioning import VERSION_KEY, get_versions, increment_version, timetable_version_name
+
+# Entries are (version, timetable); an entry is current only while its
+# version matches the user's timetable version.
+TIMETABLE_KEY = 'timetable:v2:{}'
+ENTRY_FIELDS = (
+    'id', 'course_id', 'course__title', 'teacher_id', 'teacher__username',
+    'day_of_week', 'start_time', 'end_time', 'location',
+)
+DAY_NAMES = dict(CourseSchedule.DAYS_OF_WEEK)
+TIMETABLE_VIEWS = ('week', 'today', 'next')
+
+
+def make_entry(row):
+    schedule_id, course_id, course_title, teacher_id, teacher, day_of_week, start_time, end_time, location = row
+    return {
+        'schedule_id': schedule_id,
+        'course_id': course_id,
+        'course_title': course_title,
+        'teacher_id': teacher_id,
+        'teacher': teacher,
+        'day_of_week': day_of_week,
+        'start_time': start_time.isoformat(timespec='minutes'),
+        'end_time': end_time.isoformat(timespec='minutes'),
+        'location': location,
+    }
+
+
+def _entries(schedules):
+    return [make_entry(row) for row in schedules.values_list(*ENTRY_FIELDS)]
+
+
+def _add_entries(timetable, entries):
+    schedule_ids = {entry['schedule_id'] for entry in entries}
+    _remove_entries(timetable, lambda entry: entry['schedule_id'] in schedule_ids)
+    for entry in entries:
+        insort(timetable['days'][entry['day_of_week']], entry, key=lambda e: (e['start_time'], e['schedule_id']))
+
+
+def _remove_entries(timetable, predicate):
+    timetable['days'] = [[entry for entry in day if not predicate(entry)] for day in timetable['days']]
+
+
+def build_timetable(user):
+    """Build a user's timetable from the database, one list per weekday sorted by start time."""
+    if user.role == 'student':
+        schedules = CourseSchedule.objects.filter(
+            course__enrollments__student_id=user.pk, course__enrollments__status='active'
+        )
+    elif user.role == 'teacher':
+        schedules = CourseSchedule.objects.filter(teacher_id=user.pk, course__teachers=user.pk)
+    else:
+        schedules = CourseSchedule.objects.none()
+
+    timetable = {'days': [[] for _ in DAY_NAMES]}
+    _add_entries(timetable, _entries(schedules))
+    return timetable
+
+
+def get_timetable(user):
+    """
+    Return the user's cached timetable, building it on first use.
+
+    Once cached, the entry is patched in place by the hooks below when
+    enrollments, assignments or schedules change. A build or patch that
+    lost a race leaves an entry with an older version, which is rebuilt.
+    """
+    name = timetable_version_name(user.pk)
+    key = TIMETABLE_KEY.format(user.pk)
+    found = cache.get_many([VERSION_KEY.format(name), key])
+    # The version is read before the rows, so a change committed meanwhile outdates this build.
+    version = found.get(VERSION_KEY.format(name)) or get_versions([name])[0]
+    entry = found.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    timetable = build_timetable(user)
+    cache.set(key, (version, timetable), settings.TIMETABLE_CACHE_TIMEOUT)
+    return timetable
+
+
+def _update(user_ids, apply):
+    """
+    Apply `apply(timetable, user_id)` to the cached timetables of `user_ids`
+    once the current transaction commits, so a rolled-back write never
+    reaches the cache. Callers compute what to apply beforehand.
+    """
+    user_ids = set(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: _patch(user_ids, apply))
+
+
+def _patch(user_ids, apply):
+    # Each patch moves the user's version forward by one. It may only write
+    # over the entry of the version just before: if another patch or a
+    # build got in between, the entry is left outdated and the next read
+    # rebuilds it, rather than dropping either change.
+    versions = {}
+    for user_id in user_ids:
+        version = increment_version(timetable_version_name(user_id))
+        if version is not None:
+            versions[TIMETABLE_KEY.format(user_id)] = (user_id, version)
+
+    patched = {}
+    for key, entry in cache.get_many(versions).items():
+        user_id, version = versions[key]
+        if entry[0] == version - 1:
+            apply(entry[1], user_id)
+            patched[key] = (version, entry[1])
+    if patched:
+        cache.set_many(patched, settings.TIMETABLE_CACHE_TIMEOUT)
+
+
+def enrollments_changed(enrollments):
+    """
+    Update student timetables for (student_id, course_id, status) triples.
+    Active enrollments add the course's classes, any other status removes them.
+    """
+    enrollments = list(enrollments)
+    active_courses = {course_id for _, course_id, status in enrollments if status == 'active'}
+    by_course = defaultdict(list)
+    for entry in _entries(CourseSchedule.objects.filter(course_id__in=active_courses)):
+        by_course[entry['course_id']].append(entry)
+
+    changes = defaultdict(dict)
+    for student_id, course_id, status in enrollments:
+        changes[student_id][course_id] = status == 'active'
+
+    def apply(timetable, student_id):
+        courses = changes[student_id]
+        _remove_entries(timetable, lambda entry: courses.get(entry['course_id']) is False)
+        _add_entries(timetable, [entry for course_id, active in courses.items() if active for entry in by_course[course_id]])
+
+    _update(changes, apply)
+
+
+def remove_course(user_ids, course_id):
+    """Drop a course's classes from the timetables of `user_ids` (unenrolled or unassigned)."""
+    _update(user_ids, lambda timetable, user_id: _remove_entries(
+        timetable, lambda entry: entry['course_id'] == course_id
+    ))
+
+
+def teachers_assigned(course_id, teacher_ids):
+    """Add the classes a newly assigned teacher already has on the course."""
+    entries = _entries(CourseSchedule.objects.filter(course_id=course_id, teacher_id__in=teacher_ids))
+    _update(teacher_ids, lambda timetable, teacher_id: _add_entries(
+        timetable, [entry for entry in entries if entry['teacher_id'] == teacher_id]
+    ))
+
+
+def refresh_schedules(schedules):
+    """
+    Write the current version of `schedules` into every timetable that shows them:
+    students actively enrolled in the course and the class's teacher, if assigned.
+    """
+    entries = _entries(schedules)
+    if not entries:
+        return
+
+    by_course = defaultdict(list)
+    for entry in entries:
+        by_course[entry['course_id']].append(entry)
+
+    changes = defaultdict(list)
+    for student_id, course_id in Enrollment.objects.filter(
+        course_id__in=by_course, status='active'
+    ).values_list('student_id', 'course_id'):
+        changes[student_id].extend(by_course[course_id])
+
+    assigned = set(CourseTeacher.objects.filter(
+        course_id__in=by_course, teacher_id__in={entry['teacher_id'] for entry in entries}
+    ).values_list('teacher_id', 'course_id'))
+    for entry in entries:
+        if (entry['teacher_id'], entry['course_id']) in assigned:
+            changes[entry['teacher_id']].append(entry)
+
+    _update(changes, lambda timetable, user_id: _add_entries(timetable, changes[user_id]))
+
+
+def remove_schedule(schedule_id, course_id, teacher_id):
+    """Drop a class from the timetables of the course's students and its teacher."""
+    user_ids = list(Enrollment.objects.filter(course_id=course_id).values_list('student_id', flat=True))
+    user_ids.append(teacher_id)
+    _update(user_ids, lambda timetable, user_id: _remove_entries(
+        timetable, lambda entry: entry['schedule_id'] == schedule_id
+    ))
+
+
+def forget_timetable(user_id):
+    cache.delete(TIMETABLE_KEY.format(user_id))
+
+
+def week_view(timetable):
+    return [
+        {'day_of_week': day, 'day': DAY_NAMES[day], 'classes': classes}
+        for day, classes in enumerate(timetable['days'])
+    ]
+
+
+def today_view(timetable, now=None):
+    now = now or timezone.localtime()
+    day = now.weekday()
+    return {'date': now.date(), 'day': DAY_NAMES[day], 'classes': timetable['days'][day]}
+
+
+def next_class(timetable, now=None):
+    """The first class starting after `now`, looking up to a week ahead, or None."""
+    now = now or timezone.localtime()
+    current_time = now.time().isoformat(timespec='minutes')
+    for offset in range(8):
+        day = (now.weekday() + offset) % 7
+        for entry in timetable['days'][day]:
+            if offset or entry['start_time'] > current_time:
+                return {'date': now.date() + timedelta(days=offset), 'day': DAY_NAMES[day], **entry}
+    return None
+
+
+def timetable_response(timetable, view):
+    if view == 'today':
+        return today_view(timetable)
+    if view == 'next':
+        return {'next_class': next_class(timetable)}
+    return {'days': week_view(timetable)}
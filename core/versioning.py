@@ -0,0 +1,95 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'version:{}'
+
+
+def _new_version():
+    # Counters start from the clock, so a counter that was evicted and
+    # recreated never repeats a value an older cache entry was built with.
+    return time.time_ns()
+
+
+def get_versions(names):
+    """
+    Return the current version of each name in `names`, as a list.
+    Versions are opaque numbers that change whenever bump_versions() is called.
+    """
+    keys = [VERSION_KEY.format(name) for name in names]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, _new_version(), None)
+        found.update(cache.get_many(missing))
+    return [found[key] for key in keys]
+
+
+def _bump(names):
+    for name in names:
+        key = VERSION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _new_version(), None)
+
+
+def bump_versions(names):
+    """
+    Invalidate everything cached under the current version of each name.
+
+    Inside a transaction the bump waits until it commits: bumped earlier,
+    a concurrent reader could cache the old rows under the new version.
+    Names bumped several times in one transaction are bumped once.
+    """
+    names = set(names)
+    if not names:
+        return
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _bump(names)
+        return
+
+    pending = connection.__dict__.setdefault('pending_version_bumps', set())
+    pending.update(names)
+
+    def flush():
+        # Every call registers a callback (one in a rolled-back savepoint is
+        # dropped); the first to run bumps everything pending.
+        bumped = set(pending)
+        pending.clear()
+        _bump(bumped)
+
+    transaction.on_commit(flush)
+
+
+def increment_version(name):
+    """
+    Bump one version now and return the new value, or None when it was not
+    set (it then starts from the clock, newer than anything cached before).
+    """
+    key = VERSION_KEY.format(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _new_version(), None)
+        return None
+
+
+def student_version_name(student_id):
+    return f'student:{student_id}'
+
+
+def course_version_name(course_id):
+    return f'course:{course_id}'
+
+
+def timetable_version_name(user_id):
+    return f'timetable:{user_id}'
+
+
+def group_version_name(group):
+    """A model group such as 'courses' or 'users'; bumped on any change to its rows."""
+    return f'group:{group}'
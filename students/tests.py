@@ -0,0 +1,166 @@
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import User, Course, CourseTeacher, Enrollment, CourseSchedule
+from core.timetable import TIMETABLE_KEY, get_timetable, next_class, today_view
+from core.versioning import increment_version, timetable_version_name
+
+
+class StudentEnrolledCoursesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user('student', 'student@example.com', 'pass', role='student')
+        self.teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass', role='teacher')
+        self.course = Course.objects.create(title='Algebra', description='', duration=10)
+        CourseTeacher.objects.create(course=self.course, teacher=self.teacher)
+        Enrollment.objects.create(course=self.course, student=self.student)
+        self.schedule = CourseSchedule.objects.create(
+            course=self.course, teacher=self.teacher, day_of_week=0,
+            start_time='09:00', end_time='10:00', location='Room 1'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.url = reverse('student-enrolled-courses')
+
+    def test_repeated_reads_run_no_sql(self):
+        first = self.client.get(self.url).data
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url).data
+        self.assertEqual(first, second)
+        self.assertEqual(second[0]['schedules'][0]['teacher_name'], 'teacher')
+
+    def test_conditional_get(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.schedule.location = 'Room 2'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.schedule.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_changes_invalidate_the_cached_response(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.schedule.location = 'Room 2'
+            self.schedule.save()
+        self.assertEqual(self.client.get(self.url).data[0]['schedules'][0]['location'], 'Room 2')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher.first_name = 'Ada'
+            self.teacher.save()
+        self.assertEqual(self.client.get(self.url).data[0]['teachers'][0]['first_name'], 'Ada')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Course.objects.create(title='Geometry', description='', duration=10)
+            Enrollment.objects.create(course=other, student=self.student)
+        self.assertEqual([c['title'] for c in self.client.get(self.url).data], ['Algebra', 'Geometry'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.filter(course=self.course).delete()
+        self.assertEqual([c['title'] for c in self.client.get(self.url).data], ['Geometry'])
+
+    def test_cached_response_is_invalidated_on_commit(self):
+        self.client.get(self.url)
+        other = Course.objects.create(title='Geometry', description='', duration=10)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Enrollment.objects.create(course=other, student=self.student)
+                # Not committed yet: a reader still gets the entry built from committed rows.
+                with self.assertNumQueries(0):
+                    self.assertEqual([c['title'] for c in self.client.get(self.url).data], ['Algebra'])
+
+        self.assertEqual([c['title'] for c in self.client.get(self.url).data], ['Algebra', 'Geometry'])
+
+
+class StudentTimetableTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user('student', 'student@example.com', 'pass', role='student')
+        self.teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass', role='teacher')
+        self.course = Course.objects.create(title='Algebra', description='', duration=10)
+        self.other_course = Course.objects.create(title='Physics', description='', duration=10)
+        Enrollment.objects.create(course=self.course, student=self.student)
+        self.schedule = CourseSchedule.objects.create(
+            course=self.course, teacher=self.teacher, day_of_week=2,
+            start_time='11:00', end_time='12:00', location='Room 1'
+        )
+        CourseSchedule.objects.create(
+            course=self.other_course, teacher=self.teacher, day_of_week=2,
+            start_time='09:00', end_time='10:00', location='Lab'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.url = reverse('student-timetable')
+
+    def classes(self, day=2):
+        return [(c['course_title'], c['start_time']) for c in self.client.get(self.url).data['days'][day]['classes']]
+
+    def test_changes_patch_the_cached_timetable(self):
+        self.assertEqual(self.classes(), [('Algebra', '11:00')])
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment = Enrollment.objects.create(course=self.other_course, student=self.student)
+            self.schedule.start_time = '08:00'
+            self.schedule.save()
+            self.course.title = 'Algebra I'
+            self.course.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.classes(), [('Algebra I', '08:00'), ('Physics', '09:00')])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment.status = 'dropped'
+            enrollment.save()
+            self.schedule.day_of_week = 4
+            self.schedule.save()
+        self.assertEqual(self.classes(), [])
+        self.assertEqual(self.classes(day=4), [('Algebra I', '08:00')])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.schedule.delete()
+        self.assertEqual(self.classes(day=4), [])
+
+    def test_rolled_back_and_racing_changes_are_not_cached(self):
+        self.classes()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Enrollment.objects.create(course=self.other_course, student=self.student)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        with self.assertNumQueries(0):
+            self.assertEqual(self.classes(), [('Algebra', '11:00')])
+
+        # Another change moved the version on but has not written its patch yet:
+        # this one must not patch over the older entry, and the next read rebuilds.
+        increment_version(timetable_version_name(self.student.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(course=self.other_course, student=self.student)
+        _, stale = cache.get(TIMETABLE_KEY.format(self.student.pk))
+        self.assertEqual(len(stale['days'][2]), 1)
+        self.assertEqual(self.classes(), [('Physics', '09:00'), ('Algebra', '11:00')])
+
+    def test_today_and_next_views(self):
+        timetable = get_timetable(self.student)
+        wednesday = datetime(2026, 10, 14, 10, 30)
+        self.assertEqual(today_view(timetable, wednesday)['classes'][0]['location'], 'Room 1')
+        self.assertEqual(next_class(timetable, wednesday)['date'].isoformat(), '2026-10-14')
+        self.assertEqual(next_class(timetable, wednesday.replace(hour=11))['date'].isoformat(), '2026-10-21')
+
+        response = self.client.get(self.url, {'view': 'next'})
+        self.assertEqual(response.data['next_class']['course_title'], 'Algebra')
+        self.assertEqual(self.client.get(self.url, {'view': 'month'}).status_code, 400)
@@ -1,8 +1,11 @@
 from django.urls import path
-from .views import StudentProfileView , StudentEnrolledCoursesView
+from .views import StudentProfileView , StudentEnrolledCoursesView, StudentTimetableView, StudentProfileAsyncView, StudentEnrolledCoursesAsyncView
 
 urlpatterns = [
     path('profile/', StudentProfileView.as_view(), name='student-profile'),
     path('enrolled-courses/', StudentEnrolledCoursesView.as_view(), name='student-enrolled-courses'),
+    path('timetable/', StudentTimetableView.as_view(), name='student-timetable'),
+    path('async/profile/', StudentProfileAsyncView.as_view(), name='student-profile-async'),
+    path('async/enrolled-courses/', StudentEnrolledCoursesAsyncView.as_view(), name='student-enrolled-courses-async'),
 
 ]
@@ -1,16 +1,33 @@
-from rest_framework import generics
+from rest_framework import generics, status
+from rest_framework.views import APIView
+from drf_yasg import openapi
 from rest_framework.permissions import IsAuthenticated
 from drf_yasg.utils import swagger_auto_schema
 from .serializers import StudentselfProfileSerializer, StudentEnrolledCourseSerializer
 from .permission import IsStudent
-from core.models import Course
+from core.models import Course, CourseSchedule, User
+from core.asyncviews import AsyncReadView, json_response
+from core.conditional import ConditionalGetMixin, make_validators
+from core.timetable import TIMETABLE_VIEWS, get_timetable, timetable_response
+from core.versioning import get_versions, student_version_name, course_version_name
+from django.core.cache import cache
+from django.db.models import Prefetch
+from rest_framework.response import Response
+
+def enrolled_courses(student):
+    return Course.objects.filter(students=student).order_by('id').prefetch_related(
+        Prefetch('teachers', queryset=User.objects.only('id', 'username', 'first_name', 'last_name', 'email')),
+        Prefetch('schedules', queryset=CourseSchedule.objects.select_related('teacher')),
+    )
+
 
 class StudentProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = StudentselfProfileSerializer
     permission_classes = [IsAuthenticated, IsStudent]
 
     def get_object(self):
-        return self.request.user
+        # request.user only carries the token claims, load the full profile.
+        return User.objects.get(pk=self.request.user.pk)
 
     @swagger_auto_schema(tags=["Studeent can view Profile"])
     def get(self, request, *args, **kwargs):
@@ -24,13 +41,123 @@ class StudentProfileView(generics.RetrieveUpdateAPIView):
     def patch(self, request, *args, **kwargs):
         return super().patch(request, *args, **kwargs)  
 
-class StudentEnrolledCoursesView(generics.ListAPIView):
+class StudentEnrolledCoursesView(ConditionalGetMixin, generics.ListAPIView):
+    """
+    Courses the student is enrolled in, with teachers and schedules.
+
+    Responses are cached per student. The entry is stored under the
+    student's enrollment version and remembers the version of every course
+    it contains, so a repeated read is served from three cache lookups and
+    no SQL. Enrollment, course, teacher and schedule changes bump those
+    versions (see core.signals).
+
+    The ETag comes from the newest `updated_at` and number of the enrolled
+    courses and is kept with the cached entry, so a client that already
+    has the response gets a 304 without SQL while the entry is current.
+    """
     serializer_class = StudentEnrolledCourseSerializer
     permission_classes = [IsStudent]
+    cache_timeout = 60 * 60 * 24
 
     def get_queryset(self):
-        return Course.objects.filter(students=self.request.user)
+        return enrolled_courses(self.request.user)
 
     @swagger_auto_schema(tags=["Student can view Enrolled Courses"])
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(self.enrolled_courses, request, *args, **kwargs)
+
+    def get_cached_entry(self, request):
+        [student_version] = get_versions([student_version_name(request.user.pk)])
+        cache_key = f'student_enrolled_courses:v2:{request.user.pk}:{student_version}'
+
+        cached = cache.get(cache_key)
+        if cached is not None:
+            course_versions = get_versions(course_version_name(pk) for pk in cached['course_ids'])
+            if course_versions != cached['course_versions']:
+                cached = None
+        return cache_key, cached
+
+    def get_validators(self, request, *args, **kwargs):
+        # A current cache entry carries the validators it was built with.
+        self.cache_key, self.cached = self.get_cached_entry(request)
+        if self.cached is not None:
+            return self.cached['validators']
+
+        # Otherwise they come from the same query that lists the course ids.
+        self.courses = list(
+            Course.objects.filter(students=request.user).order_by('id').values_list('id', 'updated_at')
+        )
+        modified = max((updated_at for _, updated_at in self.courses), default=None)
+        # The ids change the ETag as soon as the enrollment commits, before the
+        # course touch that follows it.
+        course_ids = [pk for pk, _ in self.courses]
+        return make_validators(modified, len(self.courses), request.user.pk, course_ids)
+
+    def enrolled_courses(self, request, *args, **kwargs):
+        if self.cached is not None:
+            return Response(self.cached['data'])
+
+        # Read the versions before the data, so a change made while the
+        # response is being built leaves the entry already outdated.
+        course_ids = [pk for pk, _ in self.courses]
+        course_versions = get_versions(course_version_name(pk) for pk in course_ids)
+
+        data = self.get_serializer(self.get_queryset().filter(id__in=course_ids), many=True).data
+        cache.set(self.cache_key, {
+            'course_ids': course_ids,
+            'course_versions': course_versions,
+            'validators': self.validators,
+            'data': data,
+        }, self.cache_timeout)
+        return Response(data)
+
+
+class StudentProfileAsyncView(AsyncReadView):
+    """The student's own profile, for ASGI (same body as student-profile)."""
+    roles = ('student',)
+
+    async def get(self, request):
+        student = await User.objects.aget(pk=request.user.pk)
+        return json_response(StudentselfProfileSerializer(student).data)
+
+
+class StudentEnrolledCoursesAsyncView(AsyncReadView):
+    """
+    Enrolled courses for ASGI (same body as student-enrolled-courses,
+    without its response cache and conditional GET).
+    """
+    roles = ('student',)
+
+    async def get(self, request):
+        courses = [course async for course in enrolled_courses(request.user)]
+        return json_response(StudentEnrolledCourseSerializer(courses, many=True).data)
+
+
+class StudentTimetableView(APIView):
+    """
+    The student's weekly timetable, served from a cache entry that is kept
+    current as enrollments, assignments and schedules change (core.timetable).
+    `?view=today` returns today's classes and `?view=next` the next class.
+    """
+    permission_classes = [IsStudent]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'view',
+                openapi.IN_QUERY,
+                description="week (default), today or next",
+                type=openapi.TYPE_STRING,
+                enum=list(TIMETABLE_VIEWS)
+            )
+        ],
+        tags=["Student can view Timetable"]
+    )
+    def get(self, request, *args, **kwargs):
+        view = request.query_params.get('view', 'week')
+        if view not in TIMETABLE_VIEWS:
+            return Response({"detail": "view must be one of week, today or next."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(timetable_response(get_timetable(request.user), view))
@@ -25,41 +25,28 @@ class TeacherAssignedCourseSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'duration', 'schedules']
 
     def get_schedules(self, obj):
-        user = self.context['request'].user
-        qs = obj.schedules.filter(teacher=user)  
+        # Views prefetch the teacher's schedules into `teacher_schedules`.
+        qs = getattr(obj, 'teacher_schedules', None)
+        if qs is None:
+            qs = obj.schedules.filter(teacher=self.context['request'].user)  
         return CourseScheduleSerializerTeacher(qs, many=True).data
 
 
 
-class StudentEnrollmentSerializer(serializers.ModelSerializer):
-    username = serializers.CharField(source='student.username', read_only=True)
-    email = serializers.EmailField(source='student.email', read_only=True)
+class StudentEnrollmentSerializer(serializers.Serializer):
+    """Serializes the enrollment value rows built by TeacherCoursesWithStudentsView."""
+    username = serializers.CharField(source='student__username', read_only=True)
+    email = serializers.EmailField(source='student__email', read_only=True)
     status = serializers.CharField()
     enrolled_at = serializers.DateTimeField()
-
-    class Meta:
-        model = Enrollment
-        fields = ['username', 'email', 'status', 'enrolled_at']
         
 
 
-class TeacherCourseWithStudentsSerializer(serializers.ModelSerializer):
-    students = serializers.SerializerMethodField()  
-
-    class Meta:
-        model = Course
-        fields = ['students']  
-
-    def get_students(self, obj):
-        user = self.context['request'].user
-
-        
-        enrollments = obj.enrollments.all()
-    
-        if user.role == 'teacher' and user not in obj.teachers.all():
-            return []
-        
-        return StudentEnrollmentSerializer(enrollments, many=True, context={'request': self.context.get('request')}).data
+class TeacherCourseWithStudentsSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    students_count = serializers.IntegerField()
+    students = StudentEnrollmentSerializer(many=True)
 
 
 
@@ -1,3 +1,123 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from core.models import User, Course, CourseTeacher, Enrollment, CourseSchedule
+
+
+class TeacherCoursesWithStudentsTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass', role='teacher')
+        other = User.objects.create_user('other', 'other@example.com', 'pass', role='teacher')
+        self.courses = Course.objects.bulk_create([
+            Course(title=f'Course {i}', description='', duration=10) for i in range(3)
+        ])
+        CourseTeacher.objects.bulk_create(
+            [CourseTeacher(course=course, teacher=self.teacher) for course in self.courses[:2]]
+            + [CourseTeacher(course=self.courses[2], teacher=other)]
+        )
+        self.student_count = 0
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def enroll(self, count):
+        students = User.objects.bulk_create([
+            User(username=f'student{self.student_count + i}', email=f'student{self.student_count + i}@example.com')
+            for i in range(count)
+        ])
+        self.student_count += count
+        Enrollment.objects.bulk_create([
+            Enrollment(course=course, student=student) for course in self.courses for student in students
+        ])
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('teacher-courses-with-students'), params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.data
+
+    def test_query_count_does_not_grow_with_rosters(self):
+        self.enroll(2)
+        small, data = self.get()
+        self.assertEqual([course['id'] for course in data], [c.id for c in self.courses[:2]])
+        self.assertEqual(len(data[0]['students']), 2)
+
+        self.enroll(300)
+        large, data = self.get()
+        self.assertEqual(len(data[1]['students']), 302)
+        self.assertEqual(small, large)
+
+    def test_students_are_paginated_per_course(self):
+        self.enroll(5)
+        _, data = self.get(students_limit=2, students_offset=1)
+
+        for course in data:
+            self.assertEqual(course['students_count'], 5)
+            self.assertEqual([s['username'] for s in course['students']], ['student1', 'student2'])
+
+
+class TeacherAssignedCoursesTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass', role='teacher')
+        other = User.objects.create_user('other', 'other@example.com', 'pass', role='teacher')
+        self.courses = Course.objects.bulk_create([
+            Course(title=f'Course {i}', description='', duration=10) for i in range(5)
+        ])
+        for course in self.courses:
+            CourseTeacher.objects.create(course=course, teacher=self.teacher)
+            for teacher in (self.teacher, other):
+                CourseSchedule.objects.create(
+                    course=course, teacher=teacher, day_of_week=0,
+                    start_time='09:00', end_time='10:00', location=teacher.username
+                )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.url = reverse('teacher-assigned-courses')
+
+    def test_schedules_are_prefetched(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 5)
+        for course in response.data:
+            self.assertEqual([s['location'] for s in course['schedules']], ['teacher'])
+
+    def test_conditional_get(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        detail_url = reverse('teacher-assigned-course-detail', args=[self.courses[0].id])
+        detail_etag = self.client.get(detail_url)['ETag']
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CourseSchedule.objects.filter(course=self.courses[0], teacher=self.teacher).get().delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code, 200)
+
+
+class TeacherTimetableTests(TestCase):
+    def test_assignment_changes_patch_the_timetable(self):
+        teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass', role='teacher')
+        course = Course.objects.create(title='Algebra', description='', duration=10)
+        CourseSchedule.objects.create(
+            course=course, teacher=teacher, day_of_week=0, start_time='09:00', end_time='10:00', location='Room 1'
+        )
+        client = APIClient()
+        client.force_authenticate(teacher)
+        url = reverse('teacher-timetable')
+
+        self.assertEqual(client.get(url).data['days'][0]['classes'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment = CourseTeacher.objects.create(course=course, teacher=teacher)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get(url).data['days'][0]['classes'][0]['course_title'], 'Algebra')
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment.delete()
+        self.assertEqual(client.get(url).data['days'][0]['classes'], [])
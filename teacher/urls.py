@@ -6,6 +6,9 @@ from .views import (
     TeacherEnrollStudentView,
     TeacherRemoveStudentView,
     TeacherAssignedCourseDetailView,
+    TeacherTimetableView,
+    TeacherProfileAsyncView,
+    TeacherAssignedCoursesAsyncView,
 )
 
 urlpatterns = [
@@ -13,6 +16,9 @@ urlpatterns = [
     path('assigned-courses/', TeacherAssignedCoursesView.as_view(), name='teacher-assigned-courses'),
     path('assigned-courses/<int:course_id>/', TeacherAssignedCourseDetailView.as_view(), name='teacher-assigned-course-detail'),
     path('courses-with-students/', TeacherCoursesWithStudentsView.as_view(), name='teacher-courses-with-students'),
+    path('timetable/', TeacherTimetableView.as_view(), name='teacher-timetable'),
+    path('async/profile/', TeacherProfileAsyncView.as_view(), name='teacher-profile-async'),
+    path('async/assigned-courses/', TeacherAssignedCoursesAsyncView.as_view(), name='teacher-assigned-courses-async'),
 
     path('enroll-student/', TeacherEnrollStudentView.as_view(), name='teacher-enroll-student'),
     path('remove-student/', TeacherRemoveStudentView.as_view(), name='teacher-remove-student'),
@@ -1,13 +1,31 @@
 from rest_framework import generics , status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 from drf_yasg.utils import swagger_auto_schema
 from .serializers import TeacherOwnProfileSerializer ,TeacherAssignedCourseSerializer , TeacherCourseWithStudentsSerializer , TeacherEnrollStudentSerializer , StudentDetailSerializer
 from .permissions import IsTeacherAndOwner
-from core.models import Course , User , Enrollment
+from core.models import Course , User , Enrollment , CourseSchedule
+from core.asyncviews import AsyncReadView, json_response
+from core.conditional import ConditionalGetMixin, updated_at_validators
+from core.timetable import TIMETABLE_VIEWS, get_timetable, timetable_response
 from teacher.permissions import IsTeacherAndOwner
 from rest_framework.response import Response
 from drf_yasg import openapi
-from admin.task import send_unenrollment_email , send_enrollment_email
+from core.outbox import emit
+from django.db import transaction
+from collections import defaultdict
+from django.db.models import Count, F, Prefetch, Window
+from django.db.models.functions import RowNumber
+
+
+def assigned_courses(teacher):
+    return Course.objects.filter(teachers=teacher).order_by('id').prefetch_related(
+        Prefetch(
+            'schedules',
+            queryset=CourseSchedule.objects.filter(teacher=teacher),
+            to_attr='teacher_schedules'
+        )
+    )
 
 
 class TeacherProfileView(generics.RetrieveUpdateAPIView):
@@ -19,8 +37,8 @@ class TeacherProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated, IsTeacherAndOwner]
 
     def get_object(self):
-      
-        return self.request.user
+        # request.user only carries the token claims, load the full profile.
+        return User.objects.get(pk=self.request.user.pk)
 
     @swagger_auto_schema(tags=["Get Teacher Profile (self)"])
     def get(self, request, *args, **kwargs):
@@ -35,25 +53,60 @@ class TeacherProfileView(generics.RetrieveUpdateAPIView):
         return self.partial_update(request, *args, **kwargs)
 
 
-class TeacherAssignedCoursesView(generics.ListAPIView):
+class TeacherAssignedCourseQuerysetMixin(ConditionalGetMixin):
+    """
+    Assigned courses with the teacher's own schedules prefetched into
+    `teacher_schedules`, so serializing them needs no extra queries.
+
+    The ETag (and, for one course, Last-Modified) comes from the newest
+    `updated_at` and the number of the teacher's courses, which costs one
+    small aggregate.
+    Assignment, schedule and teacher changes touch the course rows.
+    """
+
+    def get_queryset(self):
+        return assigned_courses(self.request.user)
+
+    def get_validators(self, request, *args, **kwargs):
+        courses = Course.objects.filter(teachers=request.user)
+        if self.lookup_url_kwarg not in kwargs:
+            return updated_at_validators(courses, request.user.pk)
+        # An unknown course skips the check and gets the usual 404.
+        courses = courses.filter(id=kwargs[self.lookup_url_kwarg])
+        return updated_at_validators(courses, request.user.pk, allow_empty=False)
+
+
+class TeacherAssignedCoursesView(TeacherAssignedCourseQuerysetMixin, generics.ListAPIView):
     serializer_class = TeacherAssignedCourseSerializer
     permission_classes = [IsAuthenticated, IsTeacherAndOwner]
 
     @swagger_auto_schema(tags=["Get Details of Assigned Courses (self)"])
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
-
-    def get_queryset(self):
-        return Course.objects.filter(teachers=self.request.user)
     
     
-class TeacherAssignedCourseDetailView(generics.RetrieveAPIView):
+class TeacherProfileAsyncView(AsyncReadView):
+    """The teacher's own profile, for ASGI (same body as teacher-profile)."""
+    roles = ('teacher',)
+
+    async def get(self, request):
+        teacher = await User.objects.aget(pk=request.user.pk)
+        return json_response(TeacherOwnProfileSerializer(teacher).data)
+
+
+class TeacherAssignedCoursesAsyncView(AsyncReadView):
+    """Assigned courses for ASGI (same body as teacher-assigned-courses, without conditional GET)."""
+    roles = ('teacher',)
+
+    async def get(self, request):
+        courses = [course async for course in assigned_courses(request.user)]
+        return json_response(TeacherAssignedCourseSerializer(courses, many=True).data)
+
+
+class TeacherAssignedCourseDetailView(TeacherAssignedCourseQuerysetMixin, generics.RetrieveAPIView):
     serializer_class = TeacherAssignedCourseSerializer
     permission_classes = [IsAuthenticated, IsTeacherAndOwner]
     lookup_url_kwarg = 'course_id'
-    
-    def get_queryset(self):
-        return Course.objects.filter(teachers=self.request.user)
 
     @swagger_auto_schema(
         operation_description="Retrieve details of a specific course assigned to the authenticated teacher.",
@@ -79,6 +132,18 @@ class TeacherCoursesWithStudentsView(generics.GenericAPIView):
                 openapi.IN_QUERY,
                 description="ID of the student to get detailed profile (optional)",
                 type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'students_limit',
+                openapi.IN_QUERY,
+                description="Maximum number of students returned per course (optional)",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'students_offset',
+                openapi.IN_QUERY,
+                description="Number of students to skip in each course (optional, used with students_limit)",
+                type=openapi.TYPE_INTEGER
             )
         ],
         tags=["Get Courses with Enrolled Students or Specific Student Profile (self)"]
@@ -101,10 +166,61 @@ class TeacherCoursesWithStudentsView(generics.GenericAPIView):
             return Response(serializer.data)
 
         else:  
-            courses = Course.objects.filter(teachers=request.user)
-            serializer = TeacherCourseWithStudentsSerializer(courses, many=True, context={'request': request})
+            try:
+                limit = self.get_int_param('students_limit')
+                offset = self.get_int_param('students_offset') or 0
+            except ValueError:
+                return Response(
+                    {"detail": "students_limit and students_offset must be non-negative integers."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            serializer = TeacherCourseWithStudentsSerializer(
+                self.get_course_rosters(request.user, limit, offset), many=True
+            )
             return Response(serializer.data)
 
+    def get_int_param(self, name):
+        value = self.request.query_params.get(name)
+        if value is None or value == '':
+            return None
+        value = int(value)
+        if value < 0:
+            raise ValueError(name)
+        return value
+
+    def get_course_rosters(self, teacher, limit=None, offset=0):
+        """
+        Build the teacher's courses with their enrolled students in three
+        queries (courses, roster counts, enrollment values) whatever the
+        number of courses or students. With `limit`, each course's roster
+        is cut to students offset+1 .. offset+limit in enrollment order.
+        """
+        courses = list(
+            Course.objects.filter(teachers=teacher).order_by('id').values('id', 'title')
+        )
+
+        enrollments = Enrollment.objects.filter(course__teachers=teacher)
+        counts = dict(
+            enrollments.order_by().values_list('course_id').annotate(total=Count('id'))
+        )
+
+        if limit is not None:
+            enrollments = enrollments.annotate(
+                position=Window(RowNumber(), partition_by=F('course_id'), order_by=F('id').asc())
+            ).filter(position__gt=offset, position__lte=offset + limit)
+
+        rosters = defaultdict(list)
+        for row in enrollments.order_by('course_id', 'id').values(
+            'course_id', 'student__username', 'student__email', 'status', 'enrolled_at'
+        ):
+            rosters[row['course_id']].append(row)
+
+        for course in courses:
+            course['students_count'] = counts.get(course['id'], 0)
+            course['students'] = rosters[course['id']]
+        return courses
+
     
 class TeacherEnrollStudentView(generics.CreateAPIView):
     serializer_class = TeacherEnrollStudentSerializer
@@ -115,9 +231,9 @@ class TeacherEnrollStudentView(generics.CreateAPIView):
         return self.create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        enrollment = serializer.save()
-    
-        send_enrollment_email.delay(enrollment.student.id, enrollment.course.id)
+        with transaction.atomic():
+            enrollment = serializer.save()
+            emit('enrollment.created', student_id=enrollment.student_id, course_id=enrollment.course_id)
 
 
 
@@ -180,13 +296,39 @@ class TeacherRemoveStudentView(generics.GenericAPIView):
         if not enrollment.course.teachers.filter(id=request.user.id).exists():
             return Response({"detail": "Not authorized to remove this student."}, status=status.HTTP_403_FORBIDDEN)
 
-        # Delete enrollment
-        enrollment.delete()
-
-        # Trigger Celery email for unenrollment
-        send_unenrollment_email.delay(student_id, course_id)
+        # Delete enrollment; the unenrollment emails go out through the outbox
+        with transaction.atomic():
+            enrollment.delete()
+            emit('enrollment.removed', student_id=enrollment.student_id, course_id=enrollment.course_id)
 
         return Response(
             {"message": "Student removed from course successfully. Emails are queued to be sent."},
             status=status.HTTP_200_OK
-        )                          
\ No newline at end of file
+        )                          
+
+
+class TeacherTimetableView(APIView):
+    """
+    The teacher's weekly timetable, served from a cache entry that is kept
+    current as enrollments, assignments and schedules change (core.timetable).
+    `?view=today` returns today's classes and `?view=next` the next class.
+    """
+    permission_classes = [IsAuthenticated, IsTeacherAndOwner]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'view',
+                openapi.IN_QUERY,
+                description="week (default), today or next",
+                type=openapi.TYPE_STRING,
+                enum=list(TIMETABLE_VIEWS)
+            )
+        ],
+        tags=["Get Teacher Timetable (self)"]
+    )
+    def get(self, request, *args, **kwargs):
+        view = request.query_params.get('view', 'week')
+        if view not in TIMETABLE_VIEWS:
+            return Response({"detail": "view must be one of week, today or next."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(timetable_response(get_timetable(request.user), view))
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from core.models import User
+
+USER_STATE_KEY = 'auth_user_state:{}'
+CLAIM_FIELDS = ('username', 'role', 'is_active')
+
+
+def add_user_claims(token, user):
+    """Copy the fields permission checks need into the token."""
+    for field in CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    return token
+
+
+def remember_user_state(user):
+    """
+    Record the user's current role/active state after a change.
+
+    Entries live as long as an access token, so every token issued before
+    the change sees the new state instead of its own (stale) claims.
+    """
+    cache.set(
+        USER_STATE_KEY.format(user.pk),
+        {field: getattr(user, field) for field in CLAIM_FIELDS},
+        settings.AUTH_USER_STATE_TIMEOUT
+    )
+
+
+def forget_user(user_id):
+    cache.set(USER_STATE_KEY.format(user_id), {'deleted': True}, settings.AUTH_USER_STATE_TIMEOUT)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds `request.user` from the token's claims
+    instead of loading it from the database.
+
+    The user is a `User` instance with only id, username, role and is_active
+    loaded; any other field is fetched on first access, and saving it only
+    writes the loaded fields. Saves and deletes recorded by
+    remember_user_state()/forget_user() take precedence over the claims.
+    Tokens issued without the claims fall back to a database lookup.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        state = cache.get(USER_STATE_KEY.format(user_id))
+        if state is None:
+            if any(field not in validated_token for field in CLAIM_FIELDS):
+                return super().get_user(validated_token)
+            state = {field: validated_token[field] for field in CLAIM_FIELDS}
+
+        if state.get('deleted'):
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not state['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return User.from_db(
+            'default',
+            ['id', *CLAIM_FIELDS],
+            [user_id, *(state[field] for field in CLAIM_FIELDS)]
+        )
@@ -0,0 +1,27 @@
+from django.contrib.auth.backends import ModelBackend
+from core.models import User
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authenticate with email and password.
+
+    The user is loaded with a single query and the password checked on that
+    instance; check_password() also upgrades the stored hash when the
+    preferred hasher or its parameters have changed.
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+
+        try:
+            user = User.objects.get(email=email)
+        except User.DoesNotExist:
+            # Hash anyway so unknown emails take as long as wrong passwords.
+            User().set_password(password)
+            return None
+
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 hasher whose cost parameters come from settings
+    (ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM).
+
+    Passwords stored with other parameters or another algorithm are
+    rehashed with these ones the next time the user logs in.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
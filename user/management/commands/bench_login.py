@@ -0,0 +1,49 @@
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.models import User
+
+
+class Command(BaseCommand):
+    help = "Measure email logins per second (lookup + password check) with the configured hasher."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200, help="Logins per thread.")
+        parser.add_argument('--threads', type=int, default=os.cpu_count(), help="Concurrent login threads.")
+
+    def handle(self, *args, **options):
+        password = uuid.uuid4().hex
+        name = f'bench-login-{uuid.uuid4().hex[:8]}'
+        user = User.objects.create_user(name, f'{name}@example.com', password)
+        threads = options['threads']
+        logins = options['logins']
+
+        def run():
+            try:
+                for _ in range(logins):
+                    if authenticate(email=user.email, password=password) is None:
+                        raise RuntimeError("Benchmark login failed.")
+            finally:
+                connection.close()
+
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                for future in [executor.submit(run) for _ in range(threads)]:
+                    future.result()
+            elapsed = time.perf_counter() - start
+        finally:
+            user.delete()
+
+        rate = threads * logins / elapsed
+        cores = min(threads, os.cpu_count())
+        self.stdout.write(f"hasher:          {type(get_hasher()).__name__}")
+        self.stdout.write(f"logins/sec:      {rate:.1f} ({threads} threads)")
+        self.stdout.write(f"logins/sec/core: {rate / cores:.1f}")
@@ -3,10 +3,11 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from core.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
+from user.authentication import add_user_claims
 
 
 from rest_framework import serializers
-from core.models import User
+from core.models import User, Notification
 import re
 
 class LoginSerializer(serializers.Serializer):
@@ -20,19 +21,13 @@ class LoginSerializer(serializers.Serializer):
         password = data.get('password')
 
         if email and password:
-            try:
-                user_obj = User.objects.get(email=email)
-                username = user_obj.username  
-            except User.DoesNotExist:
-                raise serializers.ValidationError("No user found with this email.")
-
-            user = authenticate(username=username, password=password)
+            user = authenticate(self.context.get('request'), email=email, password=password)
             if user:
                 if not user.is_active:
                     raise serializers.ValidationError("User account is disabled.")
                 
             
-                refresh = RefreshToken.for_user(user)
+                refresh = add_user_claims(RefreshToken.for_user(user), user)
                 data['access'] = str(refresh.access_token)
                 data['refresh'] = str(refresh)
                 data['user'] = {
@@ -46,3 +41,19 @@ class LoginSerializer(serializers.Serializer):
                 raise serializers.ValidationError("Unable to login with provided credentials.")
         else:
             raise serializers.ValidationError("Must include email and password.")
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'notif_type', 'title', 'message', 'is_read', 'created_at', 'related_course']
+
+
+class MarkNotificationsReadSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=500)
+    all = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if not data['all'] and not data.get('ids'):
+            raise serializers.ValidationError("Send a list of notification ids or all=true.")
+        return data
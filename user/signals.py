@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.models import User
+from .authentication import remember_user_state, forget_user
+
+
+@receiver(post_save, sender=User)
+def refresh_auth_state(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is None or set(update_fields) & {'username', 'role', 'is_active'}:
+        remember_user_state(instance)
+
+
+@receiver(post_delete, sender=User)
+def drop_auth_state(sender, instance, **kwargs):
+    forget_user(instance.pk)
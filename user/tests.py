@@ -1,3 +1,163 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import User, Course, Enrollment, Notification
+from core.notifications import build_notification, fan_out
+from students.views import StudentProfileView
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+])
+class LoginTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            username='student', email='student@example.com', role='student',
+            password=make_password('secret-pass', hasher='pbkdf2_sha256')
+        )
+        self.client = APIClient()
+
+    def login(self, password):
+        return self.client.post(
+            reverse('login-user'), {'email': 'student@example.com', 'password': password}, format='json'
+        )
+
+    def test_login_rehashes_and_then_takes_one_query(self):
+        with self.assertNumQueries(2):
+            response = self.login('secret-pass')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['role'], 'student')
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('md5$'))
+
+        with self.assertNumQueries(1):
+            response = self.login('secret-pass')
+        self.assertEqual(response.status_code, 200)
+
+    def test_wrong_password_or_email_is_rejected(self):
+        self.assertEqual(self.login('wrong').status_code, 400)
+        response = self.client.post(
+            reverse('login-user'), {'email': 'nobody@example.com', 'password': 'secret-pass'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('student', 'student@example.com', 'secret-pass', role='student')
+        self.client = APIClient()
+        response = self.client.post(
+            reverse('login-user'), {'email': 'student@example.com', 'password': 'secret-pass'}, format='json'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_reads_do_not_load_the_user(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('student-enrolled-courses'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_update_uses_the_stored_user(self):
+        response = self.client.patch(reverse('student-profile'), {'first_name': 'Ada'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], 'student@example.com')
+        self.assertEqual(User.objects.get(pk=self.user.pk).first_name, 'Ada')
+
+    def test_deactivation_and_role_changes_apply_immediately(self):
+        self.user.role = 'teacher'
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('student-enrolled-courses')).status_code, 403)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('student-enrolled-courses')).status_code, 401)
+
+
+class NotificationInboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student', 'student@example.com', 'pass', role='student')
+        other = User.objects.create_user('other', 'other@example.com', 'pass', role='student')
+        fan_out(
+            [build_notification(self.user, f'Notice {i}', 'Body', notif_type='course' if i % 2 else 'general')
+             for i in range(5)]
+            + [build_notification(other, 'Other', 'Body')]
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('notification-inbox')
+
+    def test_pages_follow_the_keyset_cursor(self):
+        first = self.client.get(self.url, {'page_size': 2}).data
+        self.assertEqual(first['unread_count'], 5)
+        self.assertEqual([n['title'] for n in first['results']], ['Notice 4', 'Notice 3'])
+
+        titles = [n['title'] for n in first['results']]
+        next_url = first['next']
+        while next_url:
+            page = self.client.get(next_url).data
+            titles += [n['title'] for n in page['results']]
+            next_url = page['next']
+        self.assertEqual(titles, [f'Notice {i}' for i in range(4, -1, -1)])
+
+        course = self.client.get(self.url, {'notif_type': 'course'}).data['results']
+        self.assertEqual([n['title'] for n in course], ['Notice 3', 'Notice 1'])
+        self.assertEqual(self.client.get(self.url, {'cursor': 'garbage'}).status_code, 404)
+
+    def test_mark_read_keeps_the_counter_in_step(self):
+        ids = list(Notification.objects.filter(user=self.user).values_list('id', flat=True)[:2])
+        mark_url = reverse('notification-mark-read')
+
+        response = self.client.post(mark_url, {'ids': ids}, format='json')
+        self.assertEqual(response.data, {'marked_read': 2, 'unread_count': 3})
+        # Marking the same rows again changes nothing.
+        response = self.client.post(mark_url, {'ids': ids}, format='json')
+        self.assertEqual(response.data, {'marked_read': 0, 'unread_count': 3})
+
+        unread = self.client.get(self.url, {'is_read': 'false'}).data
+        self.assertEqual(len(unread['results']), 3)
+
+        Notification.objects.create(user=self.user, title='One-off', message='Body')
+        response = self.client.post(mark_url, {'all': True}, format='json')
+        self.assertEqual(response.data, {'marked_read': 4, 'unread_count': 0})
+        self.assertEqual(User.objects.get(username='other').unread_notifications, 1)
+
+    def test_profile_updates_keep_the_counter(self):
+        def stale_profile(view):
+            profile = User.objects.get(pk=self.user.pk)
+            # A notification arrives while the PATCH is in flight.
+            fan_out([build_notification(self.user, 'Meanwhile', 'Body')])
+            return profile
+
+        with mock.patch.object(StudentProfileView, 'get_object', autospec=True, side_effect=stale_profile):
+            response = self.client.patch(reverse('student-profile'), {'first_name': 'Ada'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual((user.first_name, user.unread_notifications), ('Ada', 6))
+
+    def test_cascaded_deletes_keep_the_counter_in_step(self):
+        other = User.objects.get(username='other')
+        course = Course.objects.create(title='Algebra', description='', duration=10)
+        enrollment = Enrollment.objects.create(student=self.user, course=course)
+        physics = Course.objects.create(title='Physics', description='', duration=10)
+        second = Enrollment.objects.create(student=self.user, course=physics)
+        fan_out([
+            build_notification(other, 'Course', 'Body', related_course=course),
+            Notification(user=other, title='Enrollment', message='Body', related_enrollment=enrollment),
+            Notification(user=other, title='Both', message='Body', related_course=course, related_enrollment=enrollment),
+            Notification(user=other, title='Read', message='Body', related_course=course, is_read=True),
+            Notification(user=other, title='Second', message='Body', related_enrollment=second),
+        ])
+        self.assertEqual(User.objects.get(pk=other.pk).unread_notifications, 5)
+
+        course.delete()
+        self.assertEqual(User.objects.get(pk=other.pk).unread_notifications, 2)
+        second.delete()
+        self.assertEqual(User.objects.get(pk=other.pk).unread_notifications, 1)
@@ -1,7 +1,9 @@
 # user/urls.py
 from django.urls import path
-from .views import LoginView
+from .views import LoginView, NotificationInboxView, MarkNotificationsReadView
 
 urlpatterns = [
     path('login/', LoginView.as_view(), name='login-user'),
+    path('notifications/', NotificationInboxView.as_view(), name='notification-inbox'),
+    path('notifications/mark-read/', MarkNotificationsReadView.as_view(), name='notification-mark-read'),
 ]
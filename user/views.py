@@ -1,9 +1,13 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, permissions
+from rest_framework import generics, status, permissions
 from rest_framework.parsers import JSONParser
 from drf_yasg.utils import swagger_auto_schema
-from user.serializer import  LoginSerializer
+from drf_yasg import openapi
+from user.serializer import  LoginSerializer, NotificationSerializer, MarkNotificationsReadSerializer
+from core.models import Notification, User
+from core.notifications import mark_read
+from core.pagination import CreatedAtKeysetPagination
 from rest_framework_simplejwt.tokens import RefreshToken
 from user.permissions import IsCustomAdmin
 
@@ -14,7 +18,7 @@ class LoginView(APIView):
 
     @swagger_auto_schema(request_body=LoginSerializer , tags=['User (Admin , Teacher , Student) Login'])  
     def post(self, request):
-        serializer = LoginSerializer(data=request.data)
+        serializer = LoginSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             return Response({
                 "message": "Login successful",
@@ -23,3 +27,58 @@ class LoginView(APIView):
                 "refresh": serializer.validated_data['refresh']
             }, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class NotificationInboxView(generics.ListAPIView):
+    """
+    The signed-in user's notifications, newest first, for every role.
+
+    Pages are keyset-paginated on (created_at, id) and `unread_count` is
+    read from the user's counter column rather than counted.
+    """
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtKeysetPagination
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('notif_type', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              enum=[choice for choice, _ in Notification.NOTIF_TYPE]),
+            openapi.Parameter('is_read', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        tags=['User (Admin , Teacher , Student) Notifications']
+    )
+    def get(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        unread_count = User.objects.filter(pk=request.user.pk).values_list('unread_notifications', flat=True).first()
+        return Response({
+            "unread_count": unread_count or 0,
+            "next": self.paginator.get_next_link(),
+            "results": serializer.data
+        })
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(user=self.request.user)
+        notif_type = self.request.query_params.get('notif_type')
+        if notif_type:
+            queryset = queryset.filter(notif_type=notif_type)
+        is_read = self.request.query_params.get('is_read')
+        if is_read is not None:
+            queryset = queryset.filter(is_read=is_read.lower() in ('true', '1'))
+        return queryset
+
+
+class MarkNotificationsReadView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(request_body=MarkNotificationsReadSerializer, tags=['User (Admin , Teacher , Student) Notifications'])
+    def post(self, request):
+        serializer = MarkNotificationsReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = None if serializer.validated_data['all'] else serializer.validated_data['ids']
+        changed = mark_read(request.user, ids)
+        unread_count = User.objects.filter(pk=request.user.pk).values_list('unread_notifications', flat=True).first()
+        return Response({"marked_read": changed, "unread_count": unread_count or 0}, status=status.HTTP_200_OK)